@@ -0,0 +1,24 @@
+"""Составной индекс переписки для постраничной истории сообщений
+
+Revision ID: 0001_messages_conversation_index
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0001_messages_conversation_index"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_messages_conversation",
+        "messages",
+        ["sender_id", "receiver_id", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_conversation", table_name="messages")
@@ -0,0 +1,136 @@
+import hashlib as _hashlib
+import json as _json
+
+
+class Record:
+    """
+    Запись (транзакция) внутри блока.
+
+    Часто используемые поля вынесены в слоты, исходный словарь доступен через body.
+    """
+
+    __slots__ = ("type", "username", "issue", "body")
+
+    def __init__(self, body: dict) -> None:
+        self.body = body
+        self.type = body.get("type")
+        self.username = body.get("username")
+        self.issue = body.get("issue")
+
+    def __getitem__(self, key: str):
+        return self.body[key]
+
+    def get(self, key: str, default=None):
+        return self.body.get(key, default)
+
+    def __repr__(self) -> str:
+        return f"Record(type={self.type!r})"
+
+
+def decode_records(data) -> list:
+    """Разбирает поле data блока в список записей (пакетный блок или одиночная запись)."""
+    try:
+        payload = _json.loads(data)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(payload, dict):
+        return []
+    if payload.get("type") == "batch":
+        return [Record(body) for body in payload.get("transactions", [])]
+    return [Record(payload)]
+
+
+class Block:
+    """
+    Блок цепочки.
+
+    Каноническое представление (JSON с отсортированными ключами) и хэш блока считаются
+    один раз при создании и далее берутся из кэша. compute_hash() пересчитывает хэш по
+    текущим полям и нужен только для проверки на подмену.
+
+    Записи блока (records) разбираются из data не более одного раза; если блок создан из уже
+    разобранных записей, JSON не разбирается вовсе.
+    """
+
+    FIELDS = ("index", "timestamp", "data", "proof", "previous_hash")
+    # Поля, которых нет у блоков старого формата; в каноническое представление
+    # попадают, только если заданы, поэтому хэши старых блоков не меняются
+    OPTIONAL_FIELDS = ("difficulty", "version")
+
+    __slots__ = FIELDS + OPTIONAL_FIELDS + ("payload", "hash", "_records")
+
+    def __init__(self, index: int, timestamp: str, data: str, proof: int, previous_hash: str,
+                 difficulty: int = None, version: int = None, records: list = None) -> None:
+        self.index = index
+        self.timestamp = timestamp
+        self.data = data
+        self.proof = proof
+        self.previous_hash = previous_hash
+        self.difficulty = difficulty
+        # Версия схемы proof-of-work (None — исходная схема, см. mining.POW_V1)
+        self.version = version
+        # Сериализованный блок и его хэш
+        self.payload = self._serialize()
+        self.hash = _hashlib.sha256(self.payload).hexdigest()
+        self._records = [Record(body) for body in records] if records is not None else None
+
+    @property
+    def records(self) -> list:
+        if self._records is None:
+            self._records = decode_records(self.data)
+        return self._records
+
+    @classmethod
+    def from_dict(cls, block: dict) -> "Block":
+        return cls(**{field: block[field] for field in cls.FIELDS},
+                   **{field: block.get(field) for field in cls.OPTIONAL_FIELDS})
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> "Block":
+        """
+        Восстанавливает блок из сохранённого канонического представления.
+
+        Поля и хэш не вычисляются сразу, а декодируются из payload при первом обращении.
+        """
+        block = cls.__new__(cls)
+        block.payload = bytes(payload)
+        block._records = None
+        return block
+
+    def __getattr__(self, name: str):
+        # Вызывается только для незаполненных слотов блока, восстановленного из payload
+        if name == "hash":
+            self.hash = _hashlib.sha256(self.payload).hexdigest()
+            return self.hash
+        if name in self.FIELDS or name in self.OPTIONAL_FIELDS:
+            decoded = _json.loads(self.payload)
+            for field in self.FIELDS:
+                if field in decoded:
+                    setattr(self, field, decoded[field])
+            for field in self.OPTIONAL_FIELDS:
+                setattr(self, field, decoded.get(field))
+            return object.__getattribute__(self, name)
+        raise AttributeError(name)
+
+    def to_dict(self) -> dict:
+        block = {field: getattr(self, field) for field in self.FIELDS}
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                block[field] = value
+        return block
+
+    def compute_hash(self) -> str:
+        return _hashlib.sha256(self._serialize()).hexdigest()
+
+    def _serialize(self) -> bytes:
+        return _json.dumps(self.to_dict(), sort_keys=True).encode()
+
+    # Доступ как к словарю для кода, работающего с блоками-словарями
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS and key not in self.OPTIONAL_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __repr__(self) -> str:
+        return f"Block(index={self.index}, hash={self.hash[:12]})"
@@ -1,35 +1,90 @@
 import datetime as _dt
 import hashlib as _hashlib
 import json as _json
+import logging
 import os
 import sys
-
-from passlib.context import CryptContext
-
-from cryptography.fernet import Fernet
+import threading
+import time
+from collections import deque
+
+from backend.blockchain.block import Block
+from backend.blockchain.encryption import KeyRing
+from backend.blockchain.mempool import Mempool
+from backend.blockchain.mining import (CURRENT_POW_VERSION, DEFAULT_DIFFICULTY, POW_V1, SerialMiner,
+                                       is_valid_proof, next_difficulty, to_digest)
+from backend.blockchain.utils import merkle_root
 from backend.models import Role, User
+from backend.utils.metrics import record_phase
 
-# Инициализация контекста для хэширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+logger = logging.getLogger(__name__)
 
 class Blockchain:
-    def __init__(self) -> None:
+    def __init__(self, miner=None, batch_size: int = 1, batch_interval: float = None, store=None,
+                 difficulty: int = DEFAULT_DIFFICULTY, target_block_time: float = None,
+                 difficulty_window: int = 10, pow_version: int = CURRENT_POW_VERSION, key_ring: KeyRing = None,
+                 min_difficulty: int = None, difficulty_max_step: int = 2) -> None:
         self.chain = []
+        # Постоянное хранилище блоков (SegmentStore) или None для цепочки только в памяти
+        self.store = store
+        # Движок proof-of-work (SerialMiner или ParallelMiner из mining.py)
+        self.miner = miner or SerialMiner()
+        # Записи, ожидающие включения в блок
+        self.mempool = Mempool(max_size=batch_size, max_age=batch_interval)
+        # Сложность proof-of-work; при заданном target_block_time подстраивается по времени
+        # майнинга последних difficulty_window блоков
+        self.difficulty = difficulty
+        self.target_block_time = target_block_time
+        self.difficulty_window = difficulty_window
+        # Нижняя граница сложности (по умолчанию — настроенная сложность) и наибольшее
+        # изменение за блок; блоки, нарушающие их, не проходят проверку цепочки
+        self.min_difficulty = difficulty if min_difficulty is None else min_difficulty
+        self.difficulty_max_step = difficulty_max_step
+        # Версия схемы proof-of-work для новых блоков; старые проверяются по своей версии
+        self.pow_version = pow_version
+        # Последние (сложность, время майнинга в секундах) для метрик
+        self._mining_samples = deque(maxlen=difficulty_window)
+        self.blocks_mined = 0
         self.users = {}
-        self.encryption_key = Fernet.generate_key()
-        self.cipher = Fernet(self.encryption_key)
-
-        # Генезис блок
-        genesis_block = self._create_block(data='Genesis Block', proof=1, previous_hash="0", index=0)
-        self.chain.append(genesis_block)
+        # Ключи шифрования; без явного набора ключ создаётся в памяти и теряется при перезапуске
+        self.key_ring = key_ring or KeyRing()
+        # Высота, до которой цепочка уже проверена
+        self.verified_height = 0
+        # Вторичные индексы по подтверждённым записям (см. _index_block)
+        self._votes = {}
+        self._heights_by_type = {}
+        self._contract_changes = {}
+        self._indexed_height = -1
+        # Изменения цепочки, индексов и пула выполняет очередь майнинга, но история контракта
+        # читается вне её; блокировка защищает только их согласованный снимок, не proof-of-work
+        self._lock = threading.RLock()
+
+        if store is not None and len(store):
+            # Восстановление: блоки до сохранённой отметки повторно не проверяются,
+            # индексы строятся при первом запросе
+            self.chain = [Block.from_payload(payload) for payload in store]
+            self.verified_height = store.verified_height
+            # Подстроенная сложность продолжается с последнего блока; без подстройки
+            # действует сложность из настроек
+            if target_block_time:
+                self.difficulty = max(self.chain[-1].difficulty or difficulty, self.min_difficulty)
+        else:
+            # Генезис блок
+            genesis_block = self._create_block(data='Genesis Block', proof=1, previous_hash="0", index=0)
+            self._append_block(genesis_block)
 
     # Шифрование и дешифрование данных
     def encrypt_data(self, data: str) -> str:
-        return self.cipher.encrypt(data.encode()).decode()
+        return self.key_ring.encrypt(data)
 
     def decrypt_data(self, encrypted_data: str) -> str:
-        return self.cipher.decrypt(encrypted_data.encode()).decode()
+        return self.key_ring.decrypt(encrypted_data)
+
+    def encrypt_many(self, items: list) -> list:
+        return self.key_ring.encrypt_many(items)
+
+    def decrypt_many(self, tokens: list) -> list:
+        return self.key_ring.decrypt_many(tokens)
 
     # Управление пользователями
     def add_user(self, user: User):
@@ -54,15 +109,69 @@ class Blockchain:
 
     # Управление контрактами сотрудников
     def add_contract_change(self, user: User, contract_data: dict):
-        contract_hash = _hashlib.sha256(_json.dumps(contract_data, sort_keys=True).encode()).hexdigest()
+        """
+        Добавляет изменение контракта в виде конверта: тип, пользователь и хэш контракта
+        хранятся открыто, а сами условия — зашифрованными (encrypted_details).
+
+        Хэш блока покрывает шифротекст, поэтому проверка цепочки и индексы работают
+        без расшифровки; расшифровка выполняется только в get_contract_details.
+        """
+        serialized = _json.dumps(contract_data, sort_keys=True)
+        contract_hash = _hashlib.sha256(serialized.encode()).hexdigest()
         data = {
             "type": "contract_change",
             "username": user.username,
             "contract_hash": contract_hash,
-            "details": contract_data
+            "encrypted_details": self.key_ring.encrypt(serialized),
         }
-        self.mine_block(data=_json.dumps(data))
-        self.log_security_event(f"Contract change added for {user.username}")
+        self.submit_records([data, self._security_event(f"Contract change added for {user.username}")])
+
+    def get_contract_details(self, username: str, requester: User) -> list:
+        """
+        Возвращает историю изменений контракта пользователя с расшифрованными условиями.
+
+        Доступно администратору и самому пользователю. Все конверты расшифровываются одним
+        пакетом; verified — совпадение условий с открытым хэшем контракта.
+
+        Можно вызывать вне очереди майнинга: записи берутся из снимка цепочки и пула,
+        а расшифровка выполняется без блокировки.
+        """
+        if requester.role != Role.ADMIN and requester.username != username:
+            raise PermissionError(f"{requester.username} may not read contract details of {username}")
+
+        with self._lock:
+            entries = [
+                (block.index, record)
+                for block in self.get_contract_change_blocks(username)
+                for record in block.records
+                if record.type == "contract_change" and record.username == username
+            ]
+            entries += [
+                (None, record)
+                for record in self.mempool.pending()
+                if record.get("type") == "contract_change" and record.get("username") == username
+            ]
+
+        encrypted = [record.get("encrypted_details") for _, record in entries
+                     if record.get("encrypted_details") is not None]
+        decrypted = iter(self.key_ring.decrypt_many(encrypted))
+
+        history = []
+        for height, record in entries:
+            if record.get("encrypted_details") is not None:
+                serialized = next(decrypted)
+                details = _json.loads(serialized)
+            else:
+                # Изменения, записанные до появления конвертов, хранятся открыто
+                details = record.get("details")
+                serialized = _json.dumps(details, sort_keys=True)
+            history.append({
+                "block": height,
+                "contract_hash": record.get("contract_hash"),
+                "details": details,
+                "verified": _hashlib.sha256(serialized.encode()).hexdigest() == record.get("contract_hash"),
+            })
+        return history
 
     def get_employee_info(self, username: str):
         user = self.get_user(username)
@@ -71,10 +180,22 @@ class Blockchain:
                 "username": user.username,
                 "position": user.position,
                 "contract_active": user.contract_active,
-                "last_update": user.last_update
+                "last_update": user.last_update,
+                "contract_status": self._contract_status(username),
             }
         return None
 
+    def _contract_status(self, username: str):
+        # "pending" — последнее изменение ещё в пуле, "confirmed" — уже в цепочке
+        for record in self._iter_pending():
+            if record.get("type") == "contract_change" and record.get("username") == username:
+                return "pending"
+        return "confirmed" if self.get_contract_change_blocks(username) else None
+
+    def get_contract_change_blocks(self, username: str) -> list:
+        self._ensure_indexes()
+        return [self.chain[height] for height in self._contract_changes.get(username, [])]
+
     def get_current_employee_info(self):
         return [
             {
@@ -94,31 +215,34 @@ class Blockchain:
             "votes": votes,
             "timestamp": str(_dt.datetime.now())
         }
-        self.mine_block(data=_json.dumps(vote_data))
+        self.submit_records([vote_data])
 
     def collect_votes(self, issue: str, votes: list):
         vote_dict = {vote['voter']: vote['vote'] for vote in votes}
         self.create_vote(issue, vote_dict)
         return vote_dict
 
-    def get_vote_results(self, issue: str):
-        for block in reversed(self.chain):
-            # Проверяем, есть ли ключ 'type' и 'issue' в блоке
-            if "type" in block and "issue" in block:
-                if block["type"] == "vote" and block["issue"] == issue:
-                    return block["votes"]
-        return {}
+    def get_vote_results(self, issue: str, include_pending: bool = True):
+        vote = self._find_vote(issue, include_pending)
+        return vote["votes"] if vote else {}
 
     def close_vote(self, issue: str):
-        # Находим блок с голосованием и помечаем его как закрытое
-        for block in reversed(self.chain):
-            if "type" in block and "issue" in block:
-                if block["type"] == "vote" and block["issue"] == issue:
-                    block["closed"] = True
-                    self.mine_block(data=_json.dumps(block))
-                    self.log_security_event(f"Vote on issue '{issue}' closed.")
-                    return block["votes"]
-        return None
+        # Находим последнюю запись голосования и добавляем её закрытую копию
+        vote = self._find_vote(issue)
+        if vote is None:
+            return None
+        closed_vote = dict(vote, closed=True)
+        self.submit_records([closed_vote, self._security_event(f"Vote on issue '{issue}' closed.")])
+        return closed_vote["votes"]
+
+    def _find_vote(self, issue: str, include_pending: bool = True):
+        if include_pending:
+            for record in self._iter_pending():
+                if record.get("type") == "vote" and record.get("issue") == issue:
+                    return record
+        self._ensure_indexes()
+        indexed = self._votes.get(issue)
+        return indexed[1].body if indexed else None
 
     # Логирование событий доступа к данным
     def log_data_access(self, accessing_user: User, target_user: User, key: str):
@@ -129,8 +253,10 @@ class Blockchain:
             "data_key": key,
             "timestamp": str(_dt.datetime.now())
         }
-        self.mine_block(data=_json.dumps(access_log))
-        self.log_security_event(f"Data access by {accessing_user.username} to {target_user.username}'s data key {key}")
+        self.submit_records([
+            access_log,
+            self._security_event(f"Data access by {accessing_user.username} to {target_user.username}'s data key {key}"),
+        ])
 
     def check_access(self, user: User, key: str) -> bool:
         if user.role == Role.ADMIN:
@@ -138,105 +264,253 @@ class Blockchain:
         # Проверка доступа к данным (может быть настроено по-другому)
         return False
 
+    # Пул ожидающих записей и пакетные блоки
+    def submit_records(self, records: list):
+        """
+        Добавляет записи одной операции в пул и запечатывает блок, если пул готов.
+
+        :return: Новый блок или None, если записи остались ожидать в пуле
+        """
+        with self._lock:
+            self.mempool.add(records)
+        if self.mempool.is_ready():
+            return self.seal_pending()
+        return None
+
+    def seal_pending(self):
+        # Все ожидающие записи попадают в один блок с корнем Меркла
+        if not len(self.mempool):
+            return None
+        with self._lock:
+            transactions = self.mempool.drain()
+        batch = {
+            "type": "batch",
+            "merkle_root": merkle_root(transactions),
+            "transactions": transactions,
+        }
+        try:
+            return self.mine_block(data=_json.dumps(batch), records=transactions)
+        except Exception:
+            # Блок не добавлен — записи больше не считаются ожидающими
+            with self._lock:
+                self.mempool.sealed()
+            raise
+
+    def seal_if_due(self):
+        # Для периодического вызова: запечатывает пул по порогу времени
+        if self.mempool.is_ready():
+            return self.seal_pending()
+        return None
+
+    def _iter_pending(self):
+        # Ожидающие записи от новых к старым
+        return reversed(self.mempool.pending())
+
+    # Вторичные индексы
+    def get_blocks_by_type(self, record_type: str) -> list:
+        self._ensure_indexes()
+        return [self.chain[height] for height in self._heights_by_type.get(record_type, [])]
+
+    def rebuild_indexes(self) -> None:
+        """Перестраивает индексы по всей цепочке (например, после загрузки из хранилища)."""
+        with self._lock:
+            self._votes = {}
+            self._heights_by_type = {}
+            self._contract_changes = {}
+            self._indexed_height = -1
+            self._ensure_indexes()
+
+    def _ensure_indexes(self) -> None:
+        with self._lock:
+            for height in range(self._indexed_height + 1, len(self.chain)):
+                self._index_block(height, self.chain[height])
+
+    def _index_block(self, height: int, block: Block) -> None:
+        for record in block.records:
+            heights = self._heights_by_type.setdefault(record.type, [])
+            if not heights or heights[-1] != height:
+                heights.append(height)
+            if record.type == "vote":
+                # issue → последняя запись голосования и высота её блока
+                self._votes[record.issue] = (height, record)
+            elif record.type == "contract_change":
+                changes = self._contract_changes.setdefault(record.username, [])
+                if not changes or changes[-1] != height:
+                    changes.append(height)
+        self._indexed_height = height
+
     # Блокчейн функции
-    def mine_block(self, data: str) -> dict:
+    def mine_block(self, data: str, records: list = None) -> Block:
         previous_block = self.get_previous_block()
-        previous_proof = previous_block["proof"]
+        previous_proof = previous_block.proof
         index = len(self.chain)
+        difficulty = self._next_difficulty()
 
-        proof = self._proof_of_work(previous_proof, index, data)
-        previous_hash = self._hash(previous_block)
+        started = time.perf_counter()
+        proof = self._proof_of_work(previous_proof, index, data, difficulty, self.pow_version)
+        elapsed = time.perf_counter() - started
+        self._mining_samples.append((difficulty, elapsed))
+        record_phase("pow", elapsed)
+        self.blocks_mined += 1
+        previous_hash = previous_block.hash
 
-        block = self._create_block(data, proof, previous_hash, index)
-        self.chain.append(block)
+        block = self._create_block(data, proof, previous_hash, index, records, difficulty, self.pow_version)
+        self._append_block(block)
 
         return block
 
-    def _hash(self, block: dict) -> str:
-        encoded_block = _json.dumps(block, sort_keys=True).encode()
-        return _hashlib.sha256(encoded_block).hexdigest()
-
-    def _to_digest(self, new_proof: int, previous_proof: int, index: int, data: str):
-        return f"{new_proof ** 2 - previous_proof ** 2 + index}{data}".encode()
+    # Сложность и метрики майнинга
+    def _next_difficulty(self) -> int:
+        if self.target_block_time:
+            self.difficulty = next_difficulty(self.difficulty, self._mining_durations(), self.target_block_time,
+                                              self.difficulty_max_step, self.min_difficulty)
+        return self.difficulty
+
+    def _mining_durations(self) -> list:
+        # Блоки майнятся по запросу, поэтому промежутки между их временными метками — в основном
+        # простой. Сложность подстраивается по измеренному времени proof-of-work, приведённому
+        # к текущей сложности (каждый бит удваивает ожидаемую работу)
+        return [elapsed * 2 ** (self.difficulty - difficulty) for difficulty, elapsed in self._mining_samples]
+
+    def _block_intervals(self) -> list:
+        # Интервалы между последними difficulty_window блоками (генезис не учитывается)
+        window = self.chain[max(1, len(self.chain) - self.difficulty_window - 1):]
+        times = [_dt.datetime.fromisoformat(block.timestamp) for block in window]
+        return [(later - earlier).total_seconds() for earlier, later in zip(times, times[1:])]
+
+    def mining_stats(self) -> dict:
+        """Текущая сложность, среднее время блока и оценка скорости перебора (хэшей в секунду)."""
+        intervals = self._block_intervals()
+        # Вызывается из цикла событий, пока поток майнинга дописывает замеры: работаем с копией
+        samples = list(self._mining_samples)
+        mining_time = sum(duration for _, duration in samples)
+        expected_hashes = sum(2 ** difficulty for difficulty, _ in samples)
+        return {
+            "difficulty": self.difficulty,
+            "target_block_time": self.target_block_time,
+            "average_block_time": sum(intervals) / len(intervals) if intervals else None,
+            "average_mining_time": mining_time / len(samples) if samples else None,
+            "hash_rate": expected_hashes / mining_time if mining_time else None,
+            "blocks_mined": self.blocks_mined,
+        }
 
-    def _proof_of_work(self, previous_proof: int, index: int, data: str) -> int:
-        new_proof = 1
-        check_proof = False
+    def _append_block(self, block: Block) -> None:
+        if self.store is not None:
+            self.store.append(block.payload)
+        with self._lock:
+            self.chain.append(block)
+            if self._indexed_height == len(self.chain) - 2:
+                self._index_block(len(self.chain) - 1, block)
+            # Записи блока переходят из пула в цепочку одновременно для читателей снимка
+            self.mempool.sealed()
 
-        while not check_proof:
-            to_digest = self._to_digest(new_proof, previous_proof, index, data)
-            hash_value = _hashlib.sha256(to_digest).hexdigest()
+    def _hash(self, block: Block) -> str:
+        # Пересчёт хэша по полям блока — только для проверки на подмену
+        return block.compute_hash()
 
-            if hash_value[:4] == '0000':  # Условие завершения работы
-                check_proof = True
-            else:
-                new_proof += 1
+    def _to_digest(self, new_proof: int, previous_proof: int, index: int, data: str):
+        return to_digest(new_proof, previous_proof, index, data)
 
-        return new_proof
+    def _proof_of_work(self, previous_proof: int, index: int, data: str, difficulty: int = DEFAULT_DIFFICULTY,
+                       version: int = POW_V1) -> int:
+        return self.miner.find_proof(previous_proof, index, data, difficulty, version)
 
-    def get_previous_block(self) -> dict:
+    def get_previous_block(self) -> Block:
         return self.chain[-1]
 
-    def _create_block(self, data: str, proof: int, previous_hash: str, index: int) -> dict:
-        block = {
-            "index": index,
-            "timestamp": str(_dt.datetime.now()),
-            "data": data,
-            "proof": proof,
-            "previous_hash": previous_hash,
-        }
-        return block
+    def _create_block(self, data: str, proof: int, previous_hash: str, index: int, records: list = None,
+                      difficulty: int = None, version: int = None) -> Block:
+        return Block(
+            index=index,
+            timestamp=str(_dt.datetime.now()),
+            data=data,
+            proof=proof,
+            previous_hash=previous_hash,
+            difficulty=difficulty,
+            # Исходная схема записывается как отсутствие версии, чтобы формат блока не менялся
+            version=version if version and version != POW_V1 else None,
+            records=records,
+        )
 
     # Проверка целостности цепочки блоков
-    def is_chain_valid(self) -> bool:
-        current_block = self.chain[0]
-        block_index = 1
-
-        while block_index < len(self.chain):
-            next_block = self.chain[block_index]
-
-            if next_block["previous_hash"] != self._hash(current_block):
-                print('Invalid block:', next_block["index"])
-                return False
-
-            current_proof = current_block["proof"]
-            next_index, next_data, next_proof = (
-                next_block["index"],
-                next_block["data"],
-                next_block["proof"]
-            )
-
-            hash_value = _hashlib.sha256(
-                self._to_digest(new_proof=next_proof, previous_proof=current_proof, index=next_index, data=next_data)
-            ).hexdigest()
-
-            if hash_value[:4] != '0000':  # Условие для проверки корректности блока
-                print('Invalid block:', next_block["index"])
-                return False
-
-            current_block = next_block
-            block_index += 1
+    def is_chain_valid(self, full: bool = False) -> bool:
+        """
+        Проверяет цепочку блоков.
+
+        По умолчанию проверяются только блоки выше verified_height, а хэши предыдущих
+        блоков берутся из кэша. При full=True цепочка проверяется с генезиса и хэш каждого
+        блока пересчитывается заново, что позволяет обнаружить подмену уже проверенных блоков.
+        """
+        start = 0 if full else self.verified_height
+
+        for height in range(start + 1, len(self.chain)):
+            current_block = self.chain[height - 1]
+            next_block = self.chain[height]
+
+            if full and self._hash(current_block) != current_block.hash:
+                return self._invalid_block(height - 1)
+
+            if next_block.previous_hash != current_block.hash:
+                return self._invalid_block(height)
+
+            # Сложность берётся из самого блока; у блоков старого формата она не записана
+            difficulty = next_block.difficulty or DEFAULT_DIFFICULTY
+            if not self._is_allowed_difficulty(difficulty, current_block.difficulty):
+                return self._invalid_block(height)
+            version = next_block.version or POW_V1
+            if not is_valid_proof(next_block.proof, current_block.proof, next_block.index, next_block.data,
+                                  difficulty, version):
+                return self._invalid_block(height)
+
+        if full and self._hash(self.chain[-1]) != self.chain[-1].hash:
+            return self._invalid_block(len(self.chain) - 1)
+
+        self.verified_height = len(self.chain) - 1
+        if self.store is not None:
+            self.store.save_checkpoint(self.verified_height)
+        return True
 
+    def _is_allowed_difficulty(self, difficulty: int, previous_difficulty: int = None) -> bool:
+        # Цепочка, перемайненная с низкой сложностью, не должна проходить проверку
+        if difficulty < self.min_difficulty:
+            return False
+        # При подстройке сложность меняется не больше чем на difficulty_max_step бит за блок;
+        # без подстройки её меняют только настройки, и скачок между блоками допустим
+        if self.target_block_time and previous_difficulty is not None:
+            return abs(difficulty - previous_difficulty) <= self.difficulty_max_step
         return True
 
+    def _invalid_block(self, height: int) -> bool:
+        logger.warning("Invalid block: %s", self.chain[height].index)
+        # Всё, что выше последнего корректного блока, придётся проверить заново
+        self.verified_height = min(self.verified_height, max(height - 1, 0))
+        if self.store is not None:
+            self.store.save_checkpoint(self.verified_height)
+        return False
+
     # Логирование и аудит безопасности
     def log_security_event(self, event: str):
-        log_data = {
+        self.submit_records([self._security_event(event)])
+
+    @staticmethod
+    def _security_event(event: str) -> dict:
+        return {
             "type": "security_event",
             "event": event,
             "timestamp": str(_dt.datetime.now())
         }
-        self.mine_block(data=_json.dumps(log_data))
 
-    def audit_chain(self):
-        if not self.is_chain_valid():
+    def audit_chain(self) -> bool:
+        # Полная перепроверка цепочки с пересчётом хэшей всех блоков
+        if not self.is_chain_valid(full=True):
             self.log_security_event("Blockchain integrity check failed")
             self.notify_admin("Blockchain integrity check failed")
-        else:
-            self.log_security_event("Blockchain integrity check passed")
+            return False
+        self.log_security_event("Blockchain integrity check passed")
+        return True
 
     def notify_admin(self, message: str):
-        print(f"Admin notification: {message}")
+        logger.critical("Admin notification: %s", message)
 
 #
 # def blockchain_demo():
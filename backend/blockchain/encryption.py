@@ -1,4 +1,13 @@
-from cryptography.fernet import Fernet
+import fcntl
+import json as _json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
 
 # Генерация ключа шифрования
@@ -16,3 +25,224 @@ def encrypt_data(cipher: Fernet, data: str) -> str:
 # Дешифрование данных
 def decrypt_data(cipher: Fernet, encrypted_data: str) -> str:
     return cipher.decrypt(encrypted_data.encode()).decode()
+
+
+class KeyRing:
+    """
+    Набор версионированных ключей Fernet.
+
+    Новые данные шифруются текущим ключом, шифротекст имеет вид `v<версия>:<токен Fernet>`,
+    поэтому при расшифровке ключ выбирается по версии, а не перебором. Токены без версии
+    (зашифрованные до появления набора ключей) расшифровываются перебором всех ключей,
+    как в MultiFernet.
+
+    С путём к файлу ключи сохраняются и переживают перезапуск; без пути набор живёт
+    только в памяти. Файл может использоваться несколькими процессами: изменения
+    выполняются под блокировкой <файл>.lock как чтение-изменение-запись, а токен
+    с незнакомой версией приводит к перечитыванию файла. Пакетные операции для
+    больших списков выполняются на пуле потоков.
+    """
+
+    # Списки короче порога обрабатываются в вызывающем потоке
+    PARALLEL_THRESHOLD = 256
+
+    def __init__(self, path=None, workers: int = 4, chunk_size: int = 128) -> None:
+        self.path = Path(path) if path else None
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self._keys = {}
+        # Ключи в base64 для сохранения в файл
+        self._raw_keys = {}
+        self.current_version = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._rotation: Optional[dict] = None
+        self._rotation_future: Optional[Future] = None
+
+        # Несколько процессов могут стартовать одновременно — первый ключ создаёт только один
+        with self._file_lock():
+            self._reload()
+            if not self._keys:
+                self._add_key(Fernet.generate_key())
+
+    # Одиночные операции
+    def encrypt(self, data: str) -> str:
+        version = self.current_version
+        return f"v{version}:" + self._keys[version].encrypt(data.encode()).decode()
+
+    def decrypt(self, token: str) -> str:
+        version, raw = self._split(token)
+        if version is None:
+            return self._multi().decrypt(raw.encode()).decode()
+        key = self._keys.get(version) or self._refresh(version)
+        if key is None:
+            raise InvalidToken(f"Unknown key version {version}")
+        return key.decrypt(raw.encode()).decode()
+
+    def reencrypt(self, token: str) -> str:
+        """Перешифровывает токен текущим ключом; токены текущей версии не меняются."""
+        if self.key_version(token) == self.current_version:
+            return token
+        return self.encrypt(self.decrypt(token))
+
+    def key_version(self, token: str) -> Optional[int]:
+        return self._split(token)[0]
+
+    # Пакетные операции
+    def encrypt_many(self, items: list) -> list:
+        return self._map(self.encrypt, items)
+
+    def decrypt_many(self, tokens: list) -> list:
+        return self._map(self.decrypt, tokens)
+
+    def reencrypt_many(self, tokens: list) -> list:
+        return self._map(self.reencrypt, tokens)
+
+    # Ротация ключей
+    def rotate(self, tokens: Iterable[str] = (), on_reencrypted: Callable[[list, list], None] = None) -> int:
+        """
+        Добавляет новый ключ и делает его текущим.
+
+        Если переданы токены, они перешифровываются новым ключом в фоне пакетами по
+        chunk_size; для каждого пакета вызывается on_reencrypted(старые, новые). Ход
+        перешифровки — в stats()["rotation"].
+
+        :return: Версия нового ключа
+        """
+        with self._lock, self._file_lock():
+            # Другой процесс мог уже добавить ключи — версия считается от содержимого файла
+            self._reload()
+            version = self._add_key(Fernet.generate_key())
+        tokens = iter(tokens)
+        self._rotation = {"version": version, "done": 0, "running": True, "error": None}
+        self._rotation_future = self._pool().submit(self._reencrypt_in_background, tokens, on_reencrypted)
+        return version
+
+    def wait_rotation(self, timeout: float = None) -> None:
+        if self._rotation_future is not None:
+            self._rotation_future.result(timeout)
+
+    def retire(self, version: int) -> None:
+        """Удаляет старый ключ; данные, зашифрованные им, больше не расшифровать."""
+        if version == self.current_version:
+            raise ValueError("Cannot retire the current key")
+        with self._lock, self._file_lock():
+            self._reload()
+            self._keys.pop(version, None)
+            self._raw_keys.pop(version, None)
+            self._save()
+
+    def stats(self) -> dict:
+        return {
+            "current_version": self.current_version,
+            "versions": sorted(self._keys),
+            "persistent": self.path is not None,
+            "workers": self.workers,
+            "rotation": dict(self._rotation) if self._rotation else None,
+        }
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    # Внутренние функции
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="keyring")
+        return self._executor
+
+    def _map(self, func, items: list) -> list:
+        if len(items) < self.PARALLEL_THRESHOLD or self.workers == 1:
+            return [func(item) for item in items]
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        results = self._pool().map(lambda chunk: [func(item) for item in chunk], chunks)
+        return [value for chunk in results for value in chunk]
+
+    def _reencrypt_in_background(self, tokens, on_reencrypted) -> None:
+        try:
+            while True:
+                chunk = [token for _, token in zip(range(self.chunk_size), tokens)]
+                if not chunk:
+                    break
+                # Пакет обрабатывается в этом потоке: задача уже выполняется в пуле
+                rotated = [self.reencrypt(token) for token in chunk]
+                if on_reencrypted is not None:
+                    on_reencrypted(chunk, rotated)
+                self._rotation["done"] += len(chunk)
+        except Exception as e:
+            self._rotation["error"] = str(e)
+            raise
+        finally:
+            self._rotation["running"] = False
+
+    @staticmethod
+    def _split(token: str):
+        if token.startswith("v"):
+            prefix, sep, raw = token.partition(":")
+            if sep and prefix[1:].isdigit():
+                return int(prefix[1:]), raw
+        return None, token
+
+    def _multi(self) -> MultiFernet:
+        # Сначала текущий ключ, затем более старые
+        return MultiFernet([self._keys[v] for v in sorted(self._keys, reverse=True)])
+
+    @contextmanager
+    def _file_lock(self):
+        if self.path is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _reload(self) -> None:
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def _refresh(self, version: int) -> Optional[Fernet]:
+        # Токен зашифрован ключом, который добавил другой процесс; файл заменяется
+        # атомарно, поэтому читать его можно без блокировки
+        with self._lock:
+            if version not in self._keys:
+                self._reload()
+            return self._keys.get(version)
+
+    def _add_key(self, key: bytes) -> int:
+        version = max(self._keys, default=0) + 1
+        self._keys[version] = Fernet(key)
+        self._raw_keys[version] = key.decode()
+        self.current_version = version
+        self._save()
+        return version
+
+    def _load(self) -> None:
+        with open(self.path) as file:
+            stored = _json.load(file)
+        self._raw_keys = {int(version): key for version, key in stored["keys"].items()}
+        self._keys = {version: Fernet(key.encode()) for version, key in self._raw_keys.items()}
+        self.current_version = int(stored["current"])
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        # Файл ключей доступен только владельцу процесса
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as file:
+            _json.dump({"current": self.current_version,
+                        "keys": {str(version): key for version, key in self._raw_keys.items()}}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def open_key_ring(path: Optional[str], workers: int = 4) -> KeyRing:
+    """Открывает набор ключей из файла; без пути ключи живут только в памяти."""
+    return KeyRing(path or None, workers=workers)
@@ -0,0 +1,47 @@
+import time
+from typing import Optional
+
+
+class Mempool:
+    """
+    Буфер записей, ожидающих включения в блок.
+
+    Пул считается готовым к запечатыванию, когда в нём накопилось `max_size` записей
+    или самая старая запись ждёт дольше `max_age` секунд.
+    """
+
+    def __init__(self, max_size: int = 1, max_age: Optional[float] = None) -> None:
+        self.max_size = max(1, max_size)
+        self.max_age = max_age
+        self._records = []
+        self._oldest = None
+        # Записи, взятые в блок, который ещё майнится; до добавления блока они видны как ожидающие
+        self._sealing = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, records: list) -> None:
+        # Записи одной операции добавляются вместе и попадают в один блок
+        if not self._records:
+            self._oldest = time.monotonic()
+        self._records.extend(records)
+
+    def is_ready(self) -> bool:
+        if not self._records:
+            return False
+        if len(self._records) >= self.max_size:
+            return True
+        return self.max_age is not None and time.monotonic() - self._oldest >= self.max_age
+
+    def pending(self) -> list:
+        return self._sealing + self._records
+
+    def drain(self) -> list:
+        records, self._records, self._oldest = self._records, [], None
+        self._sealing = records
+        return records
+
+    def sealed(self) -> None:
+        # Блок с записями из drain() добавлен в цепочку
+        self._sealing = []
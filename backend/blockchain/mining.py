@@ -0,0 +1,167 @@
+import hashlib as _hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Сложность — число нулевых старших бит хэша. 16 бит соответствуют прежнему префиксу '0000'
+DEFAULT_DIFFICULTY = 16
+MIN_DIFFICULTY = 1
+MAX_DIFFICULTY = 64
+
+# Версии схемы proof-of-work:
+#   1 — sha256(f"{proof**2 - previous_proof**2 + index}{data}"), изменяемая часть в начале;
+#   2 — sha256(префикс блока + nonce), префикс хэшируется один раз, nonce дописывается в конец
+POW_V1 = 1
+POW_V2 = 2
+CURRENT_POW_VERSION = POW_V2
+
+_SERIAL_CHUNK = 65536
+
+
+def to_digest(new_proof: int, previous_proof: int, index: int, data: str) -> bytes:
+    return f"{new_proof ** 2 - previous_proof ** 2 + index}{data}".encode()
+
+
+def pow_prefix(previous_proof: int, index: int, data: str) -> bytes:
+    # Длина data в префиксе исключает неоднозначность на стыке data и nonce
+    encoded = data.encode()
+    return b"%d:%d:%d:" % (previous_proof, index, len(encoded)) + encoded + b":"
+
+
+def target(difficulty: int) -> int:
+    """Порог для первых 8 байт хэша: значение должно быть строго меньше порога."""
+    return 1 << (64 - difficulty)
+
+
+def is_valid_proof(new_proof: int, previous_proof: int, index: int, data: str,
+                   difficulty: int = DEFAULT_DIFFICULTY, version: int = POW_V1) -> bool:
+    if version >= POW_V2:
+        digest = _hashlib.sha256(pow_prefix(previous_proof, index, data) + b"%d" % new_proof).digest()
+    else:
+        digest = _hashlib.sha256(to_digest(new_proof, previous_proof, index, data)).digest()
+    return int.from_bytes(digest[:8], "big") < target(difficulty)
+
+
+def scan_range(previous_proof: int, index: int, data: str, start: int, stop: int,
+               difficulty: int = DEFAULT_DIFFICULTY, version: int = POW_V1) -> Optional[int]:
+    """
+    Перебирает nonce в диапазоне [start, stop) и возвращает первый подходящий.
+
+    Функция вынесена на уровень модуля, чтобы её можно было передавать в процессы пула.
+    """
+    threshold = target(difficulty)
+    from_bytes = int.from_bytes
+
+    if version >= POW_V2:
+        # Состояние sha256 после префикса копируется для каждого nonce
+        copy = _hashlib.sha256(pow_prefix(previous_proof, index, data)).copy
+        for new_proof in range(start, stop):
+            state = copy()
+            state.update(b"%d" % new_proof)
+            if from_bytes(state.digest()[:8], "big") < threshold:
+                return new_proof
+        return None
+
+    sha256 = _hashlib.sha256
+    for new_proof in range(start, stop):
+        if from_bytes(sha256(to_digest(new_proof, previous_proof, index, data)).digest()[:8], "big") < threshold:
+            return new_proof
+    return None
+
+
+def next_difficulty(current: int, intervals: list, target_interval: float, max_step: int = 2,
+                    min_difficulty: int = MIN_DIFFICULTY) -> int:
+    """
+    Подстраивает сложность под целевое время между блоками.
+
+    Ожидаемая работа удваивается с каждым битом, поэтому поправка равна log2 отношения
+    целевого интервала к среднему по окну и ограничена `max_step` битами за блок.
+
+    :param intervals: Интервалы между последними блоками в секундах
+    :param min_difficulty: Нижняя граница сложности
+    """
+    if not intervals or not target_interval:
+        return current
+    average = max(sum(intervals) / len(intervals), 1e-6)
+    step = round(math.log2(target_interval / average))
+    step = max(-max_step, min(max_step, step))
+    return max(min_difficulty, min(MAX_DIFFICULTY, current + step))
+
+
+class SerialMiner:
+    """Последовательный перебор nonce в текущем процессе."""
+
+    workers = 1
+
+    def find_proof(self, previous_proof: int, index: int, data: str, difficulty: int = DEFAULT_DIFFICULTY,
+                   version: int = CURRENT_POW_VERSION) -> int:
+        start = 1
+        while True:
+            proof = scan_range(previous_proof, index, data, start, start + _SERIAL_CHUNK, difficulty, version)
+            if proof is not None:
+                return proof
+            start += _SERIAL_CHUNK
+
+    def close(self) -> None:
+        pass
+
+
+class ParallelMiner:
+    """
+    Перебор nonce на пуле процессов.
+
+    Пространство nonce делится на последовательные окна по `chunk_size * workers` значений,
+    каждый процесс проверяет свой участок окна. Окно обрабатывается целиком, поэтому
+    минимальный найденный nonce совпадает с результатом SerialMiner.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 8192) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def find_proof(self, previous_proof: int, index: int, data: str, difficulty: int = DEFAULT_DIFFICULTY,
+                   version: int = CURRENT_POW_VERSION) -> int:
+        executor = self._get_executor()
+        start = 1
+
+        while True:
+            futures = [
+                executor.submit(
+                    scan_range,
+                    previous_proof,
+                    index,
+                    data,
+                    start + i * self.chunk_size,
+                    start + (i + 1) * self.chunk_size,
+                    difficulty,
+                    version,
+                )
+                for i in range(self.workers)
+            ]
+            found = [proof for proof in (f.result() for f in futures) if proof is not None]
+            if found:
+                return min(found)
+            start += self.chunk_size * self.workers
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def create_miner(workers: Optional[int] = 1):
+    """
+    Возвращает движок майнинга для заданного числа процессов.
+
+    :param workers: Число процессов; 1 — последовательный режим, None — по числу ядер
+    """
+    if workers is not None and workers <= 1:
+        return SerialMiner()
+    return ParallelMiner(workers=workers)
@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MiningQueueFull(Exception):
+    """Очередь майнинга заполнена — запрос нужно повторить позже."""
+
+
+class MiningSchedulerStopped(Exception):
+    """Планировщик остановлен и не принимает новые задания."""
+
+
+class MiningScheduler:
+    """
+    Фоновая очередь заданий майнинга.
+
+    Маршруты кладут задания в ограниченную asyncio-очередь, а единственный обработчик
+    выполняет их по одному в executor'е, не блокируя цикл событий. Так как задания
+    исполняются строго последовательно, цепочку не нужно защищать дополнительными блокировками.
+    """
+
+    def __init__(self, maxsize: int = 100, executor: Optional[Executor] = None) -> None:
+        self.maxsize = maxsize
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="mining")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        """Количество заданий, ожидающих выполнения."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        if self._closed:
+            raise MiningSchedulerStopped("Mining scheduler is stopped")
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, func, *args, **kwargs):
+        """Ставит задание в очередь и ждёт его результата."""
+        return await self._enqueue(func, *args, **kwargs)
+
+    def submit_nowait(self, func, *args, **kwargs) -> asyncio.Future:
+        """Ставит задание в очередь без ожидания; ошибки выполнения только логируются."""
+        future = self._enqueue(func, *args, **kwargs)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": self._worker is not None and not self._worker.done(),
+        }
+
+    async def drain(self) -> None:
+        """Ждёт выполнения заданий, уже поставленных в очередь."""
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        self._closed = True
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Задания, оставшиеся в очереди, завершаем с ошибкой, чтобы не держать ожидающих
+        while self._queue is not None and not self._queue.empty():
+            future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(MiningSchedulerStopped("Mining scheduler is stopped"))
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _enqueue(self, func, *args, **kwargs) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            # Задание выполняется в контексте отправителя, чтобы метрики относились к его запросу
+            context = contextvars.copy_context()
+            self._queue.put_nowait((future, functools.partial(context.run, func, *args, **kwargs)))
+        except asyncio.QueueFull:
+            raise MiningQueueFull(f"Mining queue is full ({self.maxsize} jobs)")
+        return future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            future, job = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                try:
+                    result = await loop.run_in_executor(self._executor, job)
+                except Exception as e:
+                    self.failed += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.completed += 1
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Background mining job failed: %s", future.exception())
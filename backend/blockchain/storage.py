@@ -0,0 +1,241 @@
+import fcntl
+import json as _json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Заголовок записи: длина полезной нагрузки; трейлер: CRC32 полезной нагрузки
+_HEADER = struct.Struct(">I")
+_TRAILER = struct.Struct(">I")
+# Запись индекса: номер сегмента, смещение записи, длина полезной нагрузки
+_INDEX_ENTRY = struct.Struct(">IQI")
+
+_SEGMENT_NAME = "segment-{:08d}.log"
+_INDEX_NAME = "blocks.idx"
+_CHECKPOINT_NAME = "checkpoint.json"
+_LOCK_NAME = "store.lock"
+
+
+class StorageCorruption(Exception):
+    """Запись блока повреждена (не совпала контрольная сумма)."""
+
+
+class StoreLocked(Exception):
+    """Каталог хранилища уже открыт другим процессом."""
+
+
+class SegmentStore:
+    """
+    Хранилище блоков только на дозапись.
+
+    Блоки пишутся в файлы-сегменты в виде `длина | данные | crc32`. Параллельно ведётся
+    индекс смещений блоков, поэтому при запуске сегменты не нужно перечитывать целиком:
+    индекс загружается, сегменты отображаются в память через mmap, а хвост, записанный
+    после последнего сброса индекса, досканируется. fsync выполняется пакетно —
+    раз в `fsync_every` добавлений или при flush()/close().
+
+    В checkpoint.json хранится высота, до которой цепочка уже была проверена.
+
+    Писать в каталог может только один процесс: при открытии берётся исключительная
+    блокировка store.lock (flock), и если её держит другой процесс, бросается StoreLocked.
+    """
+
+    def __init__(self, path, max_segment_bytes: int = 64 * 1024 * 1024, fsync_every: int = 32) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_every = max(1, fsync_every)
+        # Блокировка берётся до восстановления: оно может обрезать хвост сегмента
+        self._lock_file = self._acquire_lock()
+
+        self._entries = []  # (сегмент, смещение, длина) для каждой высоты
+        self._maps = {}
+        self._unsynced = 0
+        try:
+            self._recover()
+            self._verified_height = self._load_checkpoint()
+
+            self._index_file = open(self.path / _INDEX_NAME, "ab")
+            self._segment_no, self._segment_file = self._open_active_segment()
+        except BaseException:
+            self._lock_file.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for height in range(len(self._entries)):
+            yield self.read(height)
+
+    # Запись
+    def append(self, payload: bytes) -> int:
+        """Дописывает блок и возвращает его высоту."""
+        record_size = _HEADER.size + len(payload) + _TRAILER.size
+        if self._segment_file.tell() and self._segment_file.tell() + record_size > self.max_segment_bytes:
+            self._roll_segment()
+
+        offset = self._segment_file.tell()
+        self._segment_file.write(_HEADER.pack(len(payload)) + payload + _TRAILER.pack(zlib.crc32(payload)))
+        self._index_file.write(_INDEX_ENTRY.pack(self._segment_no, offset, len(payload)))
+        self._entries.append((self._segment_no, offset, len(payload)))
+
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.flush()
+        return len(self._entries) - 1
+
+    def flush(self) -> None:
+        # Сначала сегмент, затем индекс: индекс не должен ссылаться на недописанные данные
+        for file in (self._segment_file, self._index_file):
+            file.flush()
+            os.fsync(file.fileno())
+        self._unsynced = 0
+
+    # Чтение
+    def read(self, height: int) -> bytes:
+        segment_no, offset, length = self._entries[height]
+        mapped = self._map(segment_no, offset + _HEADER.size + length + _TRAILER.size)
+        start = offset + _HEADER.size
+        payload = mapped[start:start + length]
+        (checksum,) = _TRAILER.unpack_from(mapped, start + length)
+        if zlib.crc32(payload) != checksum:
+            raise StorageCorruption(f"Checksum mismatch for block at height {height}")
+        return payload
+
+    # Отметка проверенной высоты
+    @property
+    def verified_height(self) -> int:
+        return min(self._verified_height, max(len(self._entries) - 1, 0))
+
+    def save_checkpoint(self, verified_height: int) -> None:
+        if verified_height == self._verified_height:
+            return
+        # Проверенной может считаться только долговечно записанная часть цепочки
+        if self._unsynced:
+            self.flush()
+        tmp_path = self.path / (_CHECKPOINT_NAME + ".tmp")
+        with open(tmp_path, "w") as file:
+            _json.dump({"verified_height": verified_height}, file)
+        os.replace(tmp_path, self.path / _CHECKPOINT_NAME)
+        self._verified_height = verified_height
+
+    def close(self) -> None:
+        self.flush()
+        self._segment_file.close()
+        self._index_file.close()
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+        # Закрытие файла снимает блокировку
+        self._lock_file.close()
+
+    # Внутренние функции
+    def _acquire_lock(self):
+        lock_file = open(self.path / _LOCK_NAME, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise StoreLocked(f"Block store {self.path} is already open in another process")
+        return lock_file
+
+    def _load_checkpoint(self) -> int:
+        try:
+            with open(self.path / _CHECKPOINT_NAME) as file:
+                return int(_json.load(file)["verified_height"])
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _segment_path(self, segment_no: int) -> Path:
+        return self.path / _SEGMENT_NAME.format(segment_no)
+
+    def _segment_numbers(self) -> list:
+        return sorted(int(p.name[8:16]) for p in self.path.glob("segment-*.log"))
+
+    def _open_active_segment(self):
+        segments = self._segment_numbers()
+        segment_no = segments[-1] if segments else 0
+        file = open(self._segment_path(segment_no), "ab")
+        return segment_no, file
+
+    def _roll_segment(self) -> None:
+        self.flush()
+        self._segment_file.close()
+        self._segment_no += 1
+        self._segment_file = open(self._segment_path(self._segment_no), "ab")
+
+    def _map(self, segment_no: int, min_size: int):
+        mapped = self._maps.get(segment_no)
+        if mapped is None or len(mapped) < min_size:
+            # Активный сегмент растёт — переотображаем его, если запись вне текущего окна
+            if segment_no == getattr(self, "_segment_no", None):
+                self._segment_file.flush()
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment_no), "rb") as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment_no] = mapped
+        return mapped
+
+    def _recover(self) -> None:
+        """Загружает индекс и досканирует записи, не попавшие в него."""
+        segment_sizes = {n: self._segment_path(n).stat().st_size for n in self._segment_numbers()}
+
+        index_path = self.path / _INDEX_NAME
+        raw_index = index_path.read_bytes() if index_path.exists() else b""
+        usable = len(raw_index) - len(raw_index) % _INDEX_ENTRY.size
+        for segment_no, offset, length in _INDEX_ENTRY.iter_unpack(raw_index[:usable]):
+            if offset + _HEADER.size + length + _TRAILER.size > segment_sizes.get(segment_no, 0):
+                break
+            self._entries.append((segment_no, offset, length))
+
+        # Хвост после последней записи индекса
+        if self._entries:
+            segment_no, offset, length = self._entries[-1]
+            position = offset + _HEADER.size + length + _TRAILER.size
+        else:
+            segment_no, position = (min(segment_sizes) if segment_sizes else 0), 0
+
+        for current in sorted(n for n in segment_sizes if n >= segment_no):
+            if current != segment_no:
+                position = 0
+            position = self._scan_segment(current, position, segment_sizes[current])
+            if position < segment_sizes[current]:
+                break
+
+        # Индекс переписывается, чтобы соответствовать восстановленным записям
+        if len(self._entries) * _INDEX_ENTRY.size != len(raw_index):
+            with open(index_path, "wb") as file:
+                file.write(b"".join(_INDEX_ENTRY.pack(*entry) for entry in self._entries))
+                file.flush()
+                os.fsync(file.fileno())
+
+    def _scan_segment(self, segment_no: int, position: int, size: int) -> int:
+        with open(self._segment_path(segment_no), "r+b") as file:
+            while position + _HEADER.size <= size:
+                file.seek(position)
+                (length,) = _HEADER.unpack(file.read(_HEADER.size))
+                end = position + _HEADER.size + length + _TRAILER.size
+                if end > size:
+                    break
+                payload = file.read(length)
+                (checksum,) = _TRAILER.unpack(file.read(_TRAILER.size))
+                if zlib.crc32(payload) != checksum:
+                    break
+                self._entries.append((segment_no, position, length))
+                position = end
+            # Недописанная или повреждённая запись в конце сегмента отбрасывается
+            if position < size:
+                file.truncate(position)
+        return position
+
+
+def open_store(path: Optional[str], fsync_every: int = 32) -> Optional[SegmentStore]:
+    """Открывает хранилище блоков; без пути цепочка живёт только в памяти."""
+    if not path:
+        return None
+    return SegmentStore(path, fsync_every=fsync_every)
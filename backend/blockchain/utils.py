@@ -0,0 +1,29 @@
+import hashlib as _hashlib
+import json as _json
+
+
+# Хэш одной записи (транзакции) в каноническом JSON-представлении
+def hash_record(record) -> str:
+    return _hashlib.sha256(_json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+# Корень дерева Меркла по списку записей
+def merkle_root(records: list) -> str:
+    """
+    Считает корень дерева Меркла над записями блока.
+
+    При нечётном числе узлов на уровне последний узел дублируется.
+    Для пустого списка возвращается хэш пустой строки.
+    """
+    if not records:
+        return _hashlib.sha256(b"").hexdigest()
+
+    level = [hash_record(record) for record in records]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [
+            _hashlib.sha256((level[i] + level[i + 1]).encode()).hexdigest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0]
@@ -0,0 +1,117 @@
+import threading
+import time
+
+from fastapi.templating import Jinja2Templates
+from starlette.routing import Mount
+
+from backend.utils.metrics import (PHASES, Histogram, phase_duration, render_counter, render_histogram,
+                                   request_phases, span)
+
+# Метка для запросов, не совпавших ни с одним маршрутом (не даёт раздувать число серий)
+UNMATCHED = "unmatched"
+
+
+class RequestMetrics:
+    """Гистограммы длительности запросов по маршрутам, счётчики статусов и время фаз."""
+
+    def __init__(self) -> None:
+        self._latency = {}
+        self._responses = {}
+        self._phase_seconds = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, phases: dict) -> None:
+        key = (method, route)
+        histogram = self._latency.get(key)
+        if histogram is None:
+            histogram = self._latency.setdefault(key, Histogram())
+        histogram.observe(seconds)
+        with self._lock:
+            status_key = (method, route, status)
+            self._responses[status_key] = self._responses.get(status_key, 0) + 1
+            for phase, phase_seconds in phases.items():
+                self._phase_seconds[(route, phase)] = self._phase_seconds.get((route, phase), 0.0) + phase_seconds
+
+    def render(self) -> list:
+        lines = render_histogram(
+            "http_request_duration_seconds", "Request latency by route.",
+            [({"method": method, "route": route}, histogram)
+             for (method, route), histogram in sorted(self._latency.items())],
+        )
+        lines += render_counter(
+            "http_responses_total", "Responses by route and status code.",
+            [({"method": method, "route": route, "status": status}, count)
+             for (method, route, status), count in sorted(self._responses.items())],
+        )
+        lines += render_counter(
+            "http_request_phase_seconds_total", "Time spent in db, bcrypt, pow and template phases by route.",
+            [({"route": route, "phase": phase}, seconds)
+             for (route, phase), seconds in sorted(self._phase_seconds.items())],
+        )
+        lines += render_histogram(
+            "phase_duration_seconds", "Duration of individual db, bcrypt, pow and template operations.",
+            [({"phase": phase}, phase_duration[phase]) for phase in PHASES],
+        )
+        return lines
+
+
+request_metrics = RequestMetrics()
+
+
+class InstrumentationMiddleware:
+    """
+    Чистый ASGI middleware: замеряет длительность HTTP-запросов по шаблону маршрута
+    и собирает время фаз (db, bcrypt, pow, template), отмеченных через metrics.span().
+
+    В отличие от BaseHTTPMiddleware не оборачивает ответ и не создаёт отдельную задачу.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+        self._routes = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        phases = {}
+        token = request_phases.set(phases)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_phases.reset(token)
+            self.metrics.observe(scope["method"], self._route_label(scope), status, elapsed, phases)
+
+    def _route_label(self, scope) -> str:
+        # Роутер дописывает в scope обработчик найденного маршрута; шаблон пути берём по нему
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED
+        if self._routes is None:
+            app = scope.get("app")
+            routes = getattr(app, "routes", [])
+            self._routes = {}
+            for route in routes:
+                target = route.app if isinstance(route, Mount) else getattr(route, "endpoint", None)
+                self._routes.setdefault(target, route.path)
+        return self._routes.get(endpoint, UNMATCHED)
+
+
+class InstrumentedTemplates(Jinja2Templates):
+    """Jinja2Templates, относящий время отрисовки шаблона к фазе template."""
+
+    def TemplateResponse(self, *args, **kwargs):
+        with span("template"):
+            return super().TemplateResponse(*args, **kwargs)
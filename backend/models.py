@@ -3,7 +3,7 @@ from datetime import timezone
 from enum import Enum
 
 from sqlalchemy.sql import func
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import as_declarative
 
@@ -64,7 +64,11 @@ class User(Base):
 
 class Message(Base):
     __tablename__ = "messages"
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Выборка переписки по направлению в порядке времени (см. chat_service)
+        Index("ix_messages_conversation", "sender_id", "receiver_id", "timestamp"),
+        {'extend_existing': True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,16 +1,119 @@
-from backend.utils.database import get_db
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from backend.utils.database import get_db, pool_status
+from backend.utils.db_utils import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_page,
+                                    stream_json_array)
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from backend.models import Role, User
 from backend.schemas import RoleAssignmentRequest, UserResponse
 from backend.services.auth import get_current_user
+from backend.services.password_hasher import password_hasher
+from backend.services.principal_cache import principal_cache
+from backend.services.message_writer import message_writer
+from backend.services.user_import import CSV, NDJSON, import_users
+from backend.services.user_management import deactivate_user
+from backend.services.ws_broker import ws_broker
+from backend.services.ws_connection import send_lag
+from backend.utils.config import settings
+from backend.routers.websocket_routes import connection_stats
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
-# Получение всех пользователей (только администратор)
+_USER_COLUMNS = [User.id, User.username, User.role, User.is_active]
+
+
+def _user_row(row) -> dict:
+    return {"username": row.username, "role": row.role, "is_active": row.is_active}
+
+
+# Получение пользователей постранично (только администратор)
 @router.get("/users", response_model=list[UserResponse])
-async def get_all_users(db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_all_users(response: Response,
+                        after_id: Optional[int] = None,
+                        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                        db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    rows, next_cursor = await keyset_page(db, User.id, _USER_COLUMNS, after_id, limit)
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return [_user_row(row) for row in rows]
+
+
+# Выгрузка всех пользователей потоковым JSON (только администратор)
+@router.get("/users/export")
+async def export_users(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return StreamingResponse(stream_json_array(User.id, _USER_COLUMNS, _user_row), media_type="application/json")
+
+
+# Массовый импорт пользователей из CSV или NDJSON (только администратор)
+@router.post("/users/import")
+async def import_users_route(request: Request, format: Optional[str] = None,
+                             db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    # Формат берётся из параметра format или из Content-Type
+    fmt = format or (NDJSON if "ndjson" in request.headers.get("content-type", "") else CSV)
+    if fmt not in (CSV, NDJSON):
+        raise HTTPException(status_code=400, detail="Unsupported format, expected csv or ndjson")
+    return await import_users(db, request.stream(), fmt,
+                              hash_concurrency=settings.USER_IMPORT_HASH_CONCURRENCY or None)
+
+
+# Деактивация пользователя (только администратор)
+@router.post("/users/{username}/deactivate")
+async def deactivate_user_route(username: str, db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(get_current_user)):
+    return await deactivate_user(username, db, current_user)
+
+
+# Статистика кэша аутентификации (только администратор)
+@router.get("/auth-cache")
+async def auth_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return principal_cache.stats()
+
+
+# Метрики пула хэширования паролей (только администратор)
+@router.get("/password-pool")
+async def password_pool_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return password_hasher.stats()
+
+
+# Метрики пула соединений с базой данных (только администратор)
+@router.get("/db-pool")
+async def db_pool_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return pool_status()
+
+
+# Счётчики брокера сообщений websocket (только администратор)
+@router.get("/ws-broker")
+async def ws_broker_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return ws_broker.stats()
+
+
+# Очереди исходящих сообщений websocket и задержка отправки (только администратор)
+@router.get("/ws-connections")
+async def ws_connection_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return {"send_lag": send_lag.snapshot(), "connections": connection_stats()}
+
+
+# Счётчики пакетной записи сообщений чата (только администратор)
+@router.get("/message-writer")
+async def message_writer_stats(current_user: User = Depends(get_current_user)):
     if current_user.role != Role.ADMIN.value:
         raise HTTPException(status_code=403, detail="Access denied")
-    users = await db.execute(text("SELECT * FROM users"))
-    return [UserResponse(username=u.username, role=u.role, is_active=u.is_active) for u in users.fetchall()]
+    return message_writer.stats()
@@ -1,3 +1,4 @@
+import logging
 from datetime import timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
@@ -8,21 +9,49 @@ from backend.services.auth import (
     create_refresh_token,
     get_current_user
 )
+from backend.services.password_hasher import PasswordPoolSaturated, password_hasher
 from backend.services.user_management import assign_role
 from backend.models import User
 from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from passlib.context import CryptContext
 from starlette.responses import RedirectResponse
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Server is busy, retry later", headers={"Retry-After": "1"})
+
+
+def _ensure_password_pool_available():
+    # Отклоняем запрос до обращения к базе, если пул хэширования уже заполнен
+    if password_hasher.saturated:
+        password_hasher.rejected += 1
+        raise _password_pool_busy()
+
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordPoolSaturated:
+        raise _password_pool_busy()
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    try:
+        return await password_hasher.verify(password, hashed_password)
+    except PasswordPoolSaturated:
+        raise _password_pool_busy()
 
 
 # Регистрация нового пользователя
 @router.post("/register", response_model=UserResponse)
 async def register_user_route(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    _ensure_password_pool_available()
+
     # Проверка, существует ли пользователь
     existing_user = await db.execute(
         text("SELECT * FROM users WHERE username = :username"),
@@ -32,7 +61,7 @@ async def register_user_route(user: UserCreate, db: AsyncSession = Depends(get_d
         raise HTTPException(status_code=400, detail="User already exists")
 
     # Устанавливаем роль по умолчанию: "user"
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await hash_password(user.password)
     await db.execute(
         text(
             "INSERT INTO users (username, hashed_password, role, is_active) "
@@ -60,6 +89,8 @@ async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
+    _ensure_password_pool_available()
+
     # Поиск пользователя в базе данных
     result = await db.execute(
         text("SELECT * FROM users WHERE username = :username"),
@@ -68,8 +99,10 @@ async def login_for_access_token(
     user = result.fetchone()
 
     # Проверка пароля
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="User is inactive")
 
     # Создание токенов
     access_token = create_access_token(data={"sub": user.username})
@@ -86,6 +119,7 @@ async def login(
 ):
     username = request.username
     password = request.password
+    _ensure_password_pool_available()
 
     # Поиск пользователя
     result = await db.execute(
@@ -95,8 +129,10 @@ async def login(
     user = result.fetchone()
 
     # Проверка пароля
-    if not user or not pwd_context.verify(password, user.hashed_password):
+    if not user or not await verify_password(password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not user.is_active:
+        raise HTTPException(status_code=403, detail="User is inactive")
 
     # Создание токенов
     access_token = create_access_token(data={"sub": user.username})
@@ -133,5 +169,5 @@ async def logout(response: Response):
     redirect_response.headers["Pragma"] = "no-cache"
     redirect_response.headers["Expires"] = "0"
 
-    print("Logout executed. Cookies deleted.")
+    logger.debug("Logout executed, cookies deleted")
     return redirect_response
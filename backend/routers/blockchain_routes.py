@@ -1,39 +1,178 @@
+import asyncio
+import logging
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
-from backend.models import User
+from fastapi.responses import JSONResponse
+from backend.models import Role, User
 from backend.schemas import ContractChangeRequest
 from backend.services.auth import get_current_user
 from backend.blockchain.blockchain_func import Blockchain
+from backend.blockchain.encryption import open_key_ring
+from backend.blockchain.mining import create_miner
+from backend.blockchain.storage import open_store
+from backend.blockchain.scheduler import MiningQueueFull, MiningScheduler, MiningSchedulerStopped
+from backend.utils.config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Общий экземпляр Blockchain создаётся при первом обращении (обычно при запуске
+# приложения), а не при импорте: он открывает хранилище блоков и файл ключей
+_blockchain: Optional[Blockchain] = None
+
+
+def get_blockchain() -> Blockchain:
+    global _blockchain
+    if _blockchain is None:
+        _blockchain = Blockchain(
+            miner=create_miner(settings.MINING_WORKERS),
+            batch_size=settings.MEMPOOL_BATCH_SIZE,
+            batch_interval=settings.MEMPOOL_MAX_AGE or None,
+            store=open_store(settings.BLOCKCHAIN_DATA_DIR, fsync_every=settings.BLOCKCHAIN_FSYNC_EVERY),
+            difficulty=settings.MINING_DIFFICULTY,
+            target_block_time=settings.MINING_TARGET_BLOCK_TIME or None,
+            difficulty_window=settings.MINING_DIFFICULTY_WINDOW,
+            min_difficulty=settings.MINING_MIN_DIFFICULTY,
+            pow_version=settings.MINING_POW_VERSION,
+            key_ring=open_key_ring(settings.ENCRYPTION_KEYRING_PATH, workers=settings.ENCRYPTION_WORKERS),
+        )
+    return _blockchain
+
+
+def close_blockchain() -> None:
+    """Останавливает пул proof-of-work и закрывает набор ключей и хранилище блоков."""
+    global _blockchain
+    if _blockchain is None:
+        return
+    _blockchain.miner.close()
+    _blockchain.key_ring.close()
+    if _blockchain.store is not None:
+        _blockchain.store.close()
+    _blockchain = None
+
+# Очередь майнинга: все операции, изменяющие цепочку, выполняются в фоне по одной
+mining_scheduler = MiningScheduler(maxsize=settings.MINING_QUEUE_SIZE)
+
+
+async def run_mining_job(func, *args, wait: bool = True):
+    """
+    Отправляет задание в очередь майнинга.
+
+    :param wait: True — дождаться результата, False — только поставить в очередь
+    :return: Результат задания или None в режиме fire-and-forget
+    """
+    try:
+        if wait:
+            return await mining_scheduler.submit(func, *args)
+        mining_scheduler.submit_nowait(func, *args)
+    except MiningQueueFull:
+        raise HTTPException(status_code=429, detail="Mining queue is full, retry later",
+                            headers={"Retry-After": "1"})
+    except MiningSchedulerStopped:
+        raise HTTPException(status_code=503, detail="Mining scheduler is not running")
+
+
+async def seal_pending_periodically(interval: float):
+    """Фоновая задача: запечатывает пул записей по порогу времени."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await mining_scheduler.submit(get_blockchain().seal_if_due)
+        except MiningQueueFull:
+            continue
+        except Exception as e:
+            # Ошибка одного запечатывания не должна останавливать запечатывание по времени
+            logger.error("Periodic seal failed: %s", e)
+
+
+def _validate_and_mine(data: str) -> dict:
+    if not get_blockchain().is_chain_valid():
+        raise ValueError("Blockchain is invalid")
+    return get_blockchain().mine_block(data=data)
 
-# Создаем экземпляр Blockchain
-blockchain = Blockchain()
 
 # Добавление изменения контракта
 @router.post("/add_contract_change/")
 async def add_contract_change(request: ContractChangeRequest, current_user: User = Depends(get_current_user)):
-    user = blockchain.get_user(request.username)
+    user = get_blockchain().get_user(request.username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    blockchain.add_contract_change(request.username, request.contract_data)
+    await run_mining_job(get_blockchain().add_contract_change, user, request.contract_data)
     return {"message": "Contract change added to blockchain"}
 
+# Расшифрованная история контракта (администратор или сам пользователь); чтение
+# не занимает очередь майнинга и расшифровывается в пуле потоков
+@router.get("/contracts/{username}/")
+async def get_contract_details(username: str, current_user: User = Depends(get_current_user)):
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, get_blockchain().get_contract_details, username, current_user
+        )
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Access denied")
+
 # Логирование доступа
 @router.post("/log_data_access/")
 async def log_data_access(username: str, key: str, current_user: User = Depends(get_current_user)):
-    target_user = blockchain.get_user(username)
+    target_user = get_blockchain().get_user(username)
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not blockchain.check_access(current_user, key):
+    if not get_blockchain().check_access(current_user, key):
         raise HTTPException(status_code=403, detail="Access denied")
-    blockchain.log_data_access(current_user, target_user, key)
+    await run_mining_job(get_blockchain().log_data_access, current_user, target_user, key)
     return {"message": "Access logged successfully"}
 
 
 # Майнинг блока
 @router.post("/mine_block/")
-async def mine_block(data: str):
-    if not blockchain.is_chain_valid():
+async def mine_block(data: str, wait: bool = True):
+    if not wait:
+        await run_mining_job(_validate_and_mine, data, wait=False)
+        return JSONResponse(status_code=202, content={"message": "Block queued for mining",
+                                                      "queue_depth": mining_scheduler.depth})
+    try:
+        block = await run_mining_job(_validate_and_mine, data)
+    except ValueError:
         raise HTTPException(status_code=400, detail="Blockchain is invalid")
-    block = blockchain.mine_block(data=data)
-    return block
+    return dict(block.to_dict(), hash=block.hash)
+
+
+# Полная проверка цепочки (аудит) через очередь майнинга
+@router.post("/audit/")
+async def audit_chain(wait: bool = True, current_user: User = Depends(get_current_user)):
+    if not wait:
+        await run_mining_job(get_blockchain().audit_chain, wait=False)
+        return JSONResponse(status_code=202, content={"message": "Audit queued",
+                                                      "queue_depth": mining_scheduler.depth})
+    valid = await run_mining_job(get_blockchain().audit_chain)
+    return {"valid": valid, "verified_height": get_blockchain().verified_height}
+
+
+# Состояние очереди майнинга
+@router.get("/queue/")
+async def mining_queue_status():
+    return dict(mining_scheduler.stats(), pending_records=len(get_blockchain().mempool))
+
+
+# Метрики майнинга: сложность, время блока, скорость перебора
+@router.get("/stats/")
+async def mining_stats():
+    return get_blockchain().mining_stats()
+
+
+# Состояние набора ключей шифрования (только администратор)
+@router.get("/keys/")
+async def key_ring_status(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return get_blockchain().key_ring.stats()
+
+
+# Ротация ключа шифрования (только администратор)
+@router.post("/keys/rotate/")
+async def rotate_key(current_user: User = Depends(get_current_user)):
+    if current_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Access denied")
+    version = await asyncio.get_running_loop().run_in_executor(None, get_blockchain().key_ring.rotate)
+    return {"current_version": version}
@@ -1,54 +1,47 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from backend.models import User  # Модель User находится в models.py
 from backend.utils.database import get_db  # Функция для получения сессии базы данных
 from backend.schemas import MessageResponse, MessageCreate
 from backend.services.auth import get_current_user
-from backend.services.chat_service import create_message, get_messages_between_users
+from backend.services.chat_service import MessageNotFound, get_messages_between_users
+from backend.services.message_writer import message_writer
 from backend.utils.database import Base
-import logging
-import inspect
-
-logger = logging.getLogger(__name__)
+from backend.utils.db_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_page
 
-
-# Настройка логирования
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-from sqlalchemy.orm import registry
+# Размер страницы истории сообщений по умолчанию
+MESSAGE_PAGE_SIZE = 50
 
 
 @router.get("/users")
-async def get_users(db: AsyncSession = Depends(get_db)):
-    logger.info(f"User model file path: {inspect.getfile(User)}")
-
+async def get_users(
+        response: Response,
+        after_id: Optional[int] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        db: AsyncSession = Depends(get_db),
+):
+    """
+    Возвращает страницу собеседников (id и имя), упорядоченных по id.
 
+    Курсор следующей страницы передаётся в заголовке X-Next-Cursor.
+    """
     try:
-        try:
-            async with db as session:
-                logger.info("Successfully entered async with")
-        except Exception as e:
-            logger.error(f"Error in async with: {e}")
-            raise HTTPException(status_code=500, detail="Failed to establish session.")
-
-        logger.info(f"Using model: {User}")
-        logger.info(f"User attributes: {dir(User)}")
-        logger.info(f"User __tablename__: {getattr(User, '__tablename__', None)}")
-        logger.info(f"User columns: {getattr(User, '__table__', None)}")
-
-        # Явно указываем столбцы, чтобы исключить двусмысленность
-        query = await session.execute(select(User.id, User.username))
-        users = query.all()
-        logger.info(f"Query successful, fetched users: {users}")
+        users, next_cursor = await keyset_page(db, User.id, [User.id, User.username], after_id, limit)
     except Exception as e:
-        logger.error(f"Error fetching users: {e}")
+        logger.error("Error fetching users: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch users.")
 
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
     return [{"id": user_id, "username": username} for user_id, username in users]
 
 
@@ -57,45 +50,53 @@ async def get_users(db: AsyncSession = Depends(get_db)):
 async def send_message(
         message: MessageCreate,
         current_user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"Attempting to send a message from user {current_user.id} to user {message.receiver_id}.")
-    try:
-        if message.receiver_id == current_user.id:
-            logger.warning("User attempted to send a message to themselves.")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Cannot send a message to yourself."
-            )
-        new_message = await create_message(db, sender_id=current_user.id, message=message)
-        logger.info(f"Message sent successfully: {new_message}")
-
-        # Преобразование в Pydantic модель
-        response = MessageResponse(
-            id=new_message.id,
-            sender_id=new_message.sender_id,
-            receiver_id=new_message.receiver_id,
-            content=new_message.content,
-            timestamp=new_message.timestamp,
+    """
+    Сохраняет сообщение. Запись выполняется пакетно вместе с другими сообщениями;
+    ответ возвращается после фиксации транзакции.
+    """
+    logger.debug("Sending a message from user %s to user %s", current_user.id, message.receiver_id)
+    if message.receiver_id == current_user.id:
+        logger.warning("User attempted to send a message to themselves.")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot send a message to yourself."
         )
-        return response
+    try:
+        new_message = await message_writer.submit(current_user.id, message.receiver_id, message.content)
+        logger.debug("Message %s sent", new_message["id"])
+        return new_message
     except Exception as e:
-        logger.error(f"Error sending message: {e}")
+        logger.error("Error sending message: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to send message.")
 
 
 @router.get("/messages/{other_user_id}", response_model=list[MessageResponse])
 async def get_message_history(
         other_user_id: int,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        before: Optional[datetime] = None,
+        after: Optional[datetime] = None,
+        limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db),
 ):
-    logger.info(f"Fetching message history between users {current_user.id} and {other_user_id}.")
+    """
+    Возвращает страницу истории переписки, по умолчанию — последние сообщения.
+
+    Для подгрузки более ранних сообщений в before_id передаётся id первого сообщения
+    текущей страницы, для новых — в after_id id последнего.
+    """
+    logger.debug("Fetching message history between users %s and %s", current_user.id, other_user_id)
     try:
-        messages = await get_messages_between_users(db, current_user.id, other_user_id)
-        logger.info(f"Message history fetched successfully: {messages}")
+        messages = await get_messages_between_users(db, current_user.id, other_user_id, limit,
+                                                    before_id=before_id, after_id=after_id,
+                                                    before=before, after=after)
+        logger.debug("Message history fetched: %d messages", len(messages))
         return messages
+    except MessageNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
-        logger.error(f"Error fetching message history: {e}")
+        logger.error("Error fetching message history: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to fetch messages.")
-
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from backend.middleware.instrumentation import InstrumentedTemplates
 from backend.services.auth import get_current_user
 from backend.models import User
 import logging
 
 # Инициализация шаблонов
-templates = Jinja2Templates(directory="frontend/templates")
+templates = InstrumentedTemplates(directory="frontend/templates")
 
 router = APIRouter()
 
@@ -17,12 +17,12 @@ async def dashboard(request: Request, current_user: User = Depends(get_current_u
     if isinstance(current_user, RedirectResponse):
         return current_user
 
-    logger.info(f"User {current_user.username} with role {current_user.role} accessed dashboard")
+    logger.debug("User %s with role %s accessed dashboard", current_user.username, current_user.role)
     if current_user.role.lower() == "admin":
-        logger.info("Rendering admin_dashboard.html")
+        logger.debug("Rendering admin_dashboard.html")
         response = templates.TemplateResponse("admin_dashboard.html", {"request": request, "user": current_user})
     else:
-        logger.info("Rendering dashboard.html")
+        logger.debug("Rendering dashboard.html")
         response = templates.TemplateResponse("dashboard.html", {"request": request, "user": current_user})
 
     # Добавляем заголовки для отключения кэша
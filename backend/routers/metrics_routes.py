@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from backend.middleware.instrumentation import request_metrics
+from backend.services.ws_connection import send_lag
+from backend.utils.config import settings
+from backend.utils.database import checkout_wait
+from backend.utils.metrics import render_histogram
+
+router = APIRouter()
+
+_LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def require_metrics_access(request: Request) -> None:
+    """Пропускает только локальных клиентов, если METRICS_ALLOW_REMOTE не включён."""
+    if not settings.METRICS_ALLOW_REMOTE and (request.client is None or request.client.host not in _LOCAL_HOSTS):
+        raise HTTPException(status_code=403, detail="Metrics are only available locally")
+
+
+# Метрики в текстовом формате Prometheus
+@router.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(require_metrics_access)])
+async def metrics():
+    lines = request_metrics.render()
+    lines += render_histogram("db_pool_checkout_wait_seconds", "Time waiting for a pooled DB connection.",
+                              [({}, checkout_wait)])
+    lines += render_histogram("ws_send_lag_seconds", "Delay between queueing and sending a websocket message.",
+                              [({}, send_lag)])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
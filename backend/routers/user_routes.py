@@ -1,17 +1,19 @@
 import logging
 import sys
 import os
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.sql import text
+from backend.middleware.instrumentation import InstrumentedTemplates
 from fastapi.responses import HTMLResponse, RedirectResponse
 from backend.utils.database import get_db
-from fastapi import APIRouter, Depends, HTTPException, Request
+from backend.utils.db_utils import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, keyset_page
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from backend.models import Role, User
 from backend.schemas import RoleAssignmentRequest, UserResponse
 from backend.services.user_management import assign_role
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from typing import Optional
 from backend.services.auth import get_current_user
+from backend.services.principal_cache import principal_cache
 
 
 # Инициализация логирования
@@ -20,32 +22,40 @@ logger = logging.getLogger(__name__)
 # Создание роутера
 router = APIRouter()
 
-templates = Jinja2Templates(directory="frontend/templates")
+templates = InstrumentedTemplates(directory="frontend/templates")
 
 # Маршрут для получения всех пользователей
 @router.get("/users/", response_model=list[UserResponse])
-async def get_users(db: AsyncSession = Depends(get_db)):
+async def get_users(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Возвращает список всех пользователей в базе данных.
+    Возвращает страницу пользователей, упорядоченных по id.
+
+    Курсор следующей страницы передаётся в заголовке X-Next-Cursor; его значение
+    нужно передать в after_id следующего запроса.
 
+    :param after_id: id последнего пользователя предыдущей страницы
+    :param limit: Размер страницы
     :param db: Асинхронная сессия базы данных
     :return: Список пользователей в формате UserResponse
     """
     try:
-        logger.info("Fetching all users from the database...")
-        result = await db.execute(select(User))  # Выполняем запрос на выборку всех пользователей
-        users = result.scalars().all()  # Получаем список пользователей из результата
-        logger.info(f"Retrieved {len(users)} users.")
+        rows, next_cursor = await keyset_page(
+            db, User.id, [User.id, User.username, User.role, User.is_active], after_id, limit
+        )
+        logger.debug("Retrieved %d users after id %s", len(rows), after_id)
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
         return [
-            UserResponse(
-                username=user.username,
-                role=user.role,
-                is_active=user.is_active
-            )
-            for user in users
+            {"username": row.username, "role": row.role, "is_active": row.is_active}
+            for row in rows
         ]
     except Exception as e:
-        logger.error(f"Error while fetching users: {e}")
+        logger.error("Error while fetching users: %s", e)
         raise HTTPException(status_code=500, detail="Ошибка получения списка пользователей")
 
 
@@ -60,24 +70,25 @@ async def assign_role_endpoint(request: RoleAssignmentRequest, db: AsyncSession
     :return: Сообщение о результате выполнения
     """
     try:
-        logger.info(f"Assigning role '{request.role}' to user '{request.username}'...")
+        logger.info("Assigning role '%s' to user '%s'", request.role, request.username)
 
         # Проверяем, существует ли пользователь
         result = await db.execute(select(User).filter(User.username == request.username))
         user = result.scalars().first()
 
         if not user:
-            logger.warning(f"User '{request.username}' not found.")
+            logger.warning("User '%s' not found", request.username)
             raise HTTPException(status_code=404, detail="Пользователь не найден")
 
         # Обновляем роль пользователя
         user.role = request.role
         await db.commit()  # Подтверждаем изменения
-        logger.info(f"Role '{request.role}' assigned to user '{request.username}'.")
+        principal_cache.invalidate(request.username)
+        logger.info("Role '%s' assigned to user '%s'", request.role, request.username)
         return {"message": f"Role '{request.role}' assigned to user '{request.username}' successfully."}
 
     except Exception as e:
-        logger.error(f"Error while assigning role: {e}")
+        logger.error("Error while assigning role: %s", e)
         raise HTTPException(status_code=500, detail="Ошибка назначения роли")
 
 @router.get("/profile", response_class=HTMLResponse)
@@ -89,13 +100,11 @@ async def profile_page(
     if isinstance(current_user, RedirectResponse):
         return current_user
 
-    all_users = await db.execute(text("SELECT username FROM users"))
     response = templates.TemplateResponse(
         "profile.html",
         {
             "request": request,
             "user": current_user,
-            "all_users": all_users.fetchall(),
             "chat_history": []  # Заглушка для истории чата
         }
     )
@@ -1,54 +1,125 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from asyncio import Lock
+import logging
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+
+from backend.services.auth import authenticate_token
+from backend.services.message_writer import message_writer
+from backend.services.ws_broker import ws_broker
+from backend.services.ws_connection import ClientConnection
+from backend.utils.config import settings
+from backend.utils.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Соединения пользователей, подключённых к этому процессу. Словарь меняется только
+# из цикла событий без точек ожидания, поэтому блокировка не нужна
 connected_users = {}
-connected_users_lock = Lock()
 
-async def add_connected_user(user_id, websocket):
-    async with connected_users_lock:
-        connected_users[user_id] = websocket
+def add_connected_user(user_id, connection: ClientConnection):
+    connected_users[user_id] = connection
 
-async def remove_connected_user(user_id):
-    async with connected_users_lock:
-        connected_users.pop(user_id, None)
+def remove_connected_user(user_id, connection: ClientConnection):
+    # Пользователь мог переподключиться — удаляем только своё соединение
+    if connected_users.get(user_id) is connection:
+        del connected_users[user_id]
+
+
+async def deliver_local(recipient_id, message: dict) -> bool:
+    """Ставит сообщение в очередь получателя, если он подключён к этому процессу."""
+    connection = connected_users.get(recipient_id)
+    if connection is None:
+        return False
+    connection.enqueue(message)
+    return True
+
+
+async def route_message(recipient_id, message: dict) -> None:
+    """
+    Доставляет сообщение напрямую, если получатель подключён к этому процессу,
+    иначе публикует его через брокер для воркера, держащего сокет получателя.
+    """
+    if await deliver_local(recipient_id, message):
+        return
+    try:
+        await ws_broker.publish(recipient_id, message)
+    except Exception as e:
+        logger.error("Failed to publish message for %s: %s", recipient_id, e)
+
+
+def persist_message(connection: ClientConnection, sender_id, recipient_id, message, client_id=None) -> None:
+    """
+    Передаёт сообщение на пакетную запись; после фиксации отправителю приходит
+    подтверждение {"type": "ack"} с id сообщения (или {"type": "error"}).
+    """
+    try:
+        sender_id, recipient_id = int(sender_id), int(recipient_id)
+    except (TypeError, ValueError):
+        return
+    if not isinstance(message, str):
+        return
+
+    def acknowledge(future) -> None:
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            connection.enqueue({"type": "error", "client_id": client_id, "detail": "Failed to store message"})
+            return
+        stored = future.result()
+        connection.enqueue({
+            "type": "ack",
+            "client_id": client_id,
+            "id": stored["id"],
+            "timestamp": stored["timestamp"].isoformat(),
+        })
+
+    message_writer.submit(sender_id, recipient_id, message).add_done_callback(acknowledge)
+
+
+def connection_stats() -> list:
+    return [connection.stats() for connection in connected_users.values()]
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    user_id = websocket.headers.get("user_id")
-
-    if not user_id:
-        print("Missing user_id in headers")
-        await websocket.close(code=4000, reason="Missing user_id")
+    # Пользователь определяется по тому же cookie access_token, что и в REST-маршрутах;
+    # сессия базы нужна только на время проверки, а не на всё время соединения
+    async with AsyncSessionLocal() as db:
+        user = await authenticate_token(websocket.cookies.get("access_token"), db)
+    if user is None:
+        # Закрытие до accept() клиент получает как отказ в рукопожатии (HTTP 403)
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    print(f"User {user_id} connected")
-    await add_connected_user(user_id, websocket)
+    await websocket.accept()
+    user_id = str(user.id)
+    logger.info("User connected", extra={"user_id": user_id})
+    connection = ClientConnection(user_id, websocket, settings.WS_SEND_QUEUE_SIZE, settings.WS_OVERFLOW_POLICY)
+    connection.start()
+    add_connected_user(user_id, connection)
 
     try:
         while True:
             data = await websocket.receive_json()
-            print(f"Received data from {user_id}: {data}")
 
-            recipient_id = data.get("to")
+            if data.get("to") is None:
+                continue
+            # Соединения хранятся по строковому id пользователя
+            recipient_id = str(data["to"])
             message = data.get("message")
+            # Путь горячий: запись создаётся только при включённом DEBUG для модуля
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Websocket message", extra={"user_id": user_id, "to": recipient_id,
+                                                         "size": len(message) if isinstance(message, str) else None})
 
-            if recipient_id in connected_users:
-                recipient_socket = connected_users[recipient_id]
-                try:
-                    await recipient_socket.send_json({
-                        "from": user_id,
-                        "message": message,
-                    })
-                    print(f"Message from {user_id} to {recipient_id}: {message}")
-                except Exception as e:
-                    print(f"Failed to send message to {recipient_id}: {e}")
-            else:
-                print(f"Recipient {recipient_id} is not connected")
+            await route_message(recipient_id, {
+                "from": user_id,
+                "message": message,
+            })
+            persist_message(connection, user_id, recipient_id, message, data.get("client_id"))
     except WebSocketDisconnect:
-        print(f"User {user_id} disconnected")
-        await remove_connected_user(user_id)
-        await websocket.close()
+        logger.info("User disconnected", extra={"user_id": user_id})
+    finally:
+        remove_connected_user(user_id, connection)
+        await connection.stop()
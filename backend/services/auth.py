@@ -9,21 +9,17 @@ from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from backend.models import User
-from passlib.context import CryptContext
+from backend.services.principal_cache import principal_cache
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
 # OAuth2 схема
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-# Хэширование паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Функция для создания токена
 def create_token(data: dict, secret_key: str, expires_delta: timedelta) -> str:
     """
@@ -51,37 +47,52 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
 
 from fastapi.responses import RedirectResponse
 
-async def get_current_user(
-    request: Request, db: AsyncSession = Depends(get_db)
-) -> User:
-    # Получение токена из cookies
-    access_token = request.cookies.get("access_token")
-    print(f"Access Token: {access_token}")
+async def authenticate_token(access_token: Optional[str], db: AsyncSession):
+    """
+    Возвращает пользователя по access-токену или None, если токена нет,
+    он недействителен, пользователь не найден или деактивирован.
+    """
     if not access_token:
-        print("Access Token missing. Redirecting to login.")
-        return RedirectResponse(url="/login", status_code=302)
+        logger.debug("Access token missing")
+        return None
 
     try:
         # Декодируем токен, используя секретный ключ и алгоритм
         payload = jwt.decode(access_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username = payload.get("sub")  # Получаем username из токена
-        print(f"Decoded Username: {username}")
         if not username:
-            print("Invalid Token: No username.")
-            return RedirectResponse(url="/login", status_code=302)
+            logger.info("Invalid token: no username")
+            return None
     except JWTError:
-        print("Invalid Token: Decoding failed.")
-        return RedirectResponse(url="/login")
+        logger.info("Invalid token: decoding failed")
+        return None
+
+    # Сначала ищем пользователя в кэше, затем в базе данных
+    user = principal_cache.get(username)
+    if user is not None:
+        return user if user.is_active else None
 
-    # Выполняем запрос к базе данных, чтобы найти пользователя
     result = await db.execute(
         text("SELECT * FROM users WHERE username = :username"),
         {"username": username},
     )
     user = result.fetchone()
-    print(f"Fetched User: {user}")
     if user is None:
-        print("User not found in database.")
-        return RedirectResponse(url="/login", status_code=302)
+        logger.info("User from token not found", extra={"username": username})
+        return None
 
+    principal_cache.set(username, user)
+    if not user.is_active:
+        logger.info("User from token is inactive", extra={"username": username})
+        return None
+    return user
+
+
+async def get_current_user(
+    request: Request, db: AsyncSession = Depends(get_db)
+) -> User:
+    # Получение токена из cookies
+    user = await authenticate_token(request.cookies.get("access_token"), db)
+    if user is None:
+        return RedirectResponse(url="/login", status_code=302)
     return user
@@ -1,29 +1,69 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import tuple_, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
 from backend.models import Message
-from backend.schemas import MessageCreate
-
-async def create_message(db: AsyncSession, sender_id: int, message: MessageCreate):
-    new_message = Message(
-        sender_id=sender_id,
-        receiver_id=message.receiver_id,
-        content=message.content,
-    )
-    db.add(new_message)
-    await db.commit()
-    await db.refresh(new_message)
-    return new_message
-
-async def get_messages_between_users(db: AsyncSession, user_id: int, other_user_id: int):
-    query = (
-        select(Message)
-        .where(
-            ((Message.sender_id == user_id) & (Message.receiver_id == other_user_id))
-            | ((Message.sender_id == other_user_id) & (Message.receiver_id == user_id))
+
+# Столбцы, которые нужны ответу; связанные пользователи не загружаются
+_MESSAGE_COLUMNS = (Message.id, Message.sender_id, Message.receiver_id, Message.content, Message.timestamp)
+
+
+class MessageNotFound(Exception):
+    """Сообщение, переданное в качестве курсора, не найдено."""
+
+
+async def _cursor_key(db: AsyncSession, message_id: int):
+    timestamp = (await db.execute(select(Message.timestamp).where(Message.id == message_id))).scalar()
+    if timestamp is None:
+        raise MessageNotFound(f"Message {message_id} not found")
+    return timestamp, message_id
+
+
+async def get_messages_between_users(db: AsyncSession, user_id: int, other_user_id: int, limit: int = 50,
+                                     before_id: Optional[int] = None, after_id: Optional[int] = None,
+                                     before: Optional[datetime] = None, after: Optional[datetime] = None):
+    """
+    Возвращает страницу переписки двух пользователей в хронологическом порядке.
+
+    Без курсора возвращаются последние `limit` сообщений. Курсор задаётся id сообщения
+    (before_id/after_id) или временем (before/after); страница «до» курсора — более ранние
+    сообщения, «после» — более поздние.
+
+    Каждое направление переписки выбирается отдельным запросом по индексу
+    (sender_id, receiver_id, timestamp), поэтому стоимость не зависит от длины переписки.
+    """
+    order_key = tuple_(Message.timestamp, Message.id)
+    conditions = []
+    if before_id is not None:
+        conditions.append(order_key < tuple_(*await _cursor_key(db, before_id)))
+    if after_id is not None:
+        conditions.append(order_key > tuple_(*await _cursor_key(db, after_id)))
+    if before is not None:
+        conditions.append(Message.timestamp < before)
+    if after is not None:
+        conditions.append(Message.timestamp > after)
+
+    # Страница «после» курсора идёт от него вперёд, остальные — от конца переписки назад
+    forward = (after_id is not None or after is not None) and before_id is None and before is None
+    ordering = (Message.timestamp, Message.id) if forward else (Message.timestamp.desc(), Message.id.desc())
+
+    def direction(sender_id: int, receiver_id: int):
+        return (
+            select(*_MESSAGE_COLUMNS)
+            .where(Message.sender_id == sender_id, Message.receiver_id == receiver_id, *conditions)
+            .order_by(*ordering)
+            .limit(limit)
+            .subquery()
         )
-        .order_by(Message.timestamp)
-        .options(joinedload(Message.sender), joinedload(Message.receiver))
-    )
-    result = await db.execute(query)
-    return result.scalars().all()
\ No newline at end of file
+
+    both = union_all(select(direction(user_id, other_user_id)), select(direction(other_user_id, user_id))).subquery()
+    query = select(both)
+    if forward:
+        query = query.order_by(both.c.timestamp, both.c.id)
+    else:
+        query = query.order_by(both.c.timestamp.desc(), both.c.id.desc())
+
+    rows = (await db.execute(query.limit(limit))).mappings().all()
+    return rows if forward else rows[::-1]
@@ -0,0 +1,142 @@
+import asyncio
+import datetime as dt
+import logging
+from datetime import timezone
+from typing import Optional
+
+from sqlalchemy import insert
+
+from backend.models import Message
+from backend.utils.config import settings
+from backend.utils.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """
+    Отложенная пакетная запись сообщений чата.
+
+    Сообщения из REST и websocket копятся в буфере и записываются одной многострочной
+    вставкой в одной транзакции — при накоплении `batch_size` сообщений или через
+    `flush_interval` секунд после первого сообщения в буфере. submit() возвращает
+    future, который завершается записанной строкой после фиксации транзакции.
+    Если пакет не записался, строки повторяются по одной и ошибку получают только
+    те сообщения, которые не записались сами.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, batch_size: int = 100,
+                 flush_interval: float = 0.05) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes = set()
+        self._flush_pending = False
+        self._lock = asyncio.Lock()
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def submit(self, sender_id: int, receiver_id: int, content: str) -> asyncio.Future:
+        values = {
+            "sender_id": sender_id,
+            "receiver_id": receiver_id,
+            "content": content,
+            "timestamp": dt.datetime.now(timezone.utc),
+        }
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append((values, future))
+
+        if len(self._buffer) >= self.batch_size and not self._flush_pending:
+            self._flush_pending = True
+            self._spawn_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+        return future
+
+    async def flush(self) -> None:
+        """Записывает всё, что накоплено в буфере к моменту вызова, пакетами по batch_size."""
+        self._flush_pending = False
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        while self._buffer:
+            batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+            await self._write(batch)
+
+    async def _write(self, batch: list) -> None:
+        # Пакеты пишутся по одному, чтобы id и время сообщений шли в порядке поступления
+        async with self._lock:
+            try:
+                ids = await self._insert([values for values, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch, e)
+                    return
+                # Одна плохая строка (например, несуществующий получатель) не должна
+                # ронять остальные: повторяем пакет построчно
+                logger.warning("Chat message batch of %d failed, retrying row by row: %s", len(batch), e)
+                for values, future in batch:
+                    try:
+                        ids = await self._insert([values])
+                    except Exception as row_error:
+                        self._fail([(values, future)], row_error)
+                    else:
+                        self._succeed([(values, future)], ids)
+                return
+            self._succeed(batch, ids)
+
+    async def _insert(self, rows: list) -> list:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                insert(Message).returning(Message.id, sort_by_parameter_order=True),
+                rows,
+            )
+            ids = result.scalars().all()
+            await db.commit()
+        return ids
+
+    def _succeed(self, batch: list, ids: list) -> None:
+        self.written += len(batch)
+        self.batches += 1
+        for message_id, (values, future) in zip(ids, batch):
+            if not future.done():
+                future.set_result({"id": message_id, **values})
+
+    def _fail(self, batch: list, error: Exception) -> None:
+        self.failed += len(batch)
+        logger.error("Failed to persist %d chat messages: %s", len(batch), error)
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def stop(self) -> None:
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "avg_batch": self.written / self.batches if self.batches else 0.0,
+        }
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    def _spawn_flush(self) -> None:
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+
+message_writer = MessageWriter(
+    batch_size=settings.MESSAGE_BATCH_SIZE,
+    flush_interval=settings.MESSAGE_FLUSH_INTERVAL,
+)
@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.security import get_pwd_context
+from backend.utils.config import settings
+from backend.utils.metrics import span
+
+
+class PasswordPoolSaturated(Exception):
+    """Все слоты пула хэширования заняты — запрос отклоняется сразу."""
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей на отдельном ограниченном пуле потоков.
+
+    bcrypt освобождает GIL, поэтому потоки выполняются параллельно и не блокируют цикл
+    событий. Число одновременно принятых заданий (выполняемых и ожидающих) ограничено
+    `max_pending`; сверх лимита вызывается PasswordPoolSaturated.
+    """
+
+    def __init__(self, context=None, workers: int = 2, max_pending: int = 32) -> None:
+        # Без явного контекста используется общий, который создаётся лениво
+        self._context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._queue_wait = 0.0
+        self._run_time = 0.0
+        # Счётчики выполнения обновляются из потоков пула
+        self._lock = threading.Lock()
+
+    @property
+    def context(self):
+        if self._context is None:
+            self._context = get_pwd_context()
+        return self._context
+
+    @property
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(self.context.verify, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": self.running,
+            "queued": self.pending - self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_wait_ms": self._queue_wait / self.completed * 1000 if self.completed else 0.0,
+            "avg_run_ms": self._run_time / self.completed * 1000 if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, func, *args):
+        if self.saturated:
+            self.rejected += 1
+            raise PasswordPoolSaturated("Password hashing pool is saturated")
+
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            # Контекст запроса передаётся в поток, чтобы время bcrypt попало в метрики запроса
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, context.run, self._timed, submitted, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    def _timed(self, submitted: float, func, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            with span("bcrypt"):
+                return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self._queue_wait += started - submitted
+                self._run_time += finished - started
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
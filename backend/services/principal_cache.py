@@ -0,0 +1,65 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from backend.utils.config import settings
+
+
+class PrincipalCache:
+    """
+    Кэш аутентифицированных пользователей по subject токена (username).
+
+    Записи живут не дольше `ttl` секунд; при переполнении вытесняется давно не
+    использованная запись (LRU). При изменении пользователя (роль, деактивация)
+    запись нужно явно сбросить через invalidate().
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, username: str) -> Optional[Any]:
+        entry = self._entries.get(username)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, username: str, principal: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[username] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+principal_cache = PrincipalCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
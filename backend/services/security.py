@@ -0,0 +1,14 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    Общий контекст хэширования паролей.
+
+    Создаётся при первом обращении, поэтому импорт модулей приложения не загружает
+    passlib и не инициализирует bcrypt.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
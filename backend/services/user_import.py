@@ -0,0 +1,215 @@
+import asyncio
+import csv
+import json
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.models import Role, User
+from backend.services.password_hasher import PasswordPoolSaturated, password_hasher
+
+# Форматы входного потока
+CSV = "csv"
+NDJSON = "ndjson"
+
+# Статусы строк в отчёте об импорте
+CREATED = "created"
+EXISTS = "exists"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+FAILED = "failed"
+
+_ROLES = {role.value for role in Role}
+
+
+def _decode(line: bytes) -> Optional[str]:
+    try:
+        return line.decode("utf-8-sig").rstrip("\r")
+    except UnicodeDecodeError:
+        return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Разбивает поток байтов на строки, не загружая тело запроса целиком.
+
+    Вместо строки, которая не декодируется как UTF-8, возвращается None.
+    """
+    tail = b""
+    async for chunk in chunks:
+        tail += chunk
+        *lines, tail = tail.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if tail:
+        yield _decode(tail)
+
+
+async def iter_rows(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple]:
+    """
+    Возвращает пары (номер строки, словарь полей или текст ошибки).
+
+    CSV должен начинаться с заголовка (username,password[,role]); значения полей
+    не могут содержать переводы строк.
+    """
+    header = None
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if line is None:
+            yield line_no, "Invalid UTF-8"
+            continue
+        if not line.strip():
+            continue
+        if fmt == NDJSON:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, "Malformed JSON"
+                continue
+            yield line_no, row if isinstance(row, dict) else "Expected a JSON object"
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield line_no, dict(zip(header, values))
+
+
+def _validate(row: dict) -> Optional[str]:
+    username, password = row.get("username"), row.get("password")
+    if not isinstance(username, str) or not isinstance(password, str) or not username or not password:
+        return "username and password are required"
+    role = row.get("role")
+    if role is not None and not isinstance(role, str):
+        return "role must be a string"
+    if (role or Role.USER.value) not in _ROLES:
+        return f"Unknown role: {role}"
+    return None
+
+
+def _insert(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    return dialect.insert(User.__table__)
+
+
+class UserImporter:
+    """
+    Пакетный импорт пользователей.
+
+    Строки обрабатываются пакетами по `batch_size`: имена, уже занятые в базе, отсекаются
+    одним запросом до хэширования, пароли остальных хэшируются параллельно на пуле
+    PasswordHasher (не более `hash_concurrency` одновременно, чтобы оставить место
+    входам пользователей), затем пакет вставляется одним многострочным INSERT
+    с ON CONFLICT DO NOTHING и фиксируется.
+    """
+
+    def __init__(self, db: AsyncSession, hasher=password_hasher, batch_size: int = 500,
+                 hash_concurrency: Optional[int] = None) -> None:
+        self.db = db
+        self.hasher = hasher
+        self.batch_size = max(1, batch_size)
+        # По умолчанию импорт занимает половину пула, но не меньше двух слотов, чтобы пароли
+        # хэшировались параллельно и при пуле из двух потоков; входы ждут не дольше одного bcrypt
+        self._hash_slots = asyncio.Semaphore(hash_concurrency or max(2, hasher.workers // 2))
+        self._seen = set()
+        self.report = []
+
+    async def run(self, rows: AsyncIterator[tuple]) -> dict:
+        batch = []
+        async for line_no, row in rows:
+            if isinstance(row, str):
+                self._result(line_no, None, INVALID, row)
+                continue
+            error = _validate(row)
+            if error:
+                self._result(line_no, str(row.get("username") or "") or None, INVALID, error)
+                continue
+            if row["username"] in self._seen:
+                self._result(line_no, row["username"], DUPLICATE, "Repeated in the import")
+                continue
+            self._seen.add(row["username"])
+            batch.append((line_no, row))
+            if len(batch) >= self.batch_size:
+                await self._import_batch(batch)
+                batch = []
+        if batch:
+            await self._import_batch(batch)
+        return self.summary()
+
+    def summary(self) -> dict:
+        counts = {}
+        self.report.sort(key=lambda entry: entry["line"])
+        for entry in self.report:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return {"total": len(self.report), "counts": counts, "rows": self.report}
+
+    async def _import_batch(self, batch: list) -> None:
+        usernames = [row["username"] for _, row in batch]
+        existing = set((await self.db.execute(
+            select(User.username).where(User.username.in_(usernames))
+        )).scalars().all())
+
+        pending = []
+        for line_no, row in batch:
+            if row["username"] in existing:
+                self._result(line_no, row["username"], EXISTS)
+            else:
+                pending.append((line_no, row))
+        if not pending:
+            return
+
+        hashes = await asyncio.gather(*(self._hash(row["password"]) for _, row in pending))
+        values = [
+            {
+                "username": row["username"],
+                "hashed_password": hashed,
+                "role": row.get("role") or Role.USER.value,
+                "is_active": True,
+            }
+            for (_, row), hashed in zip(pending, hashes)
+        ]
+
+        statement = (
+            _insert(self.db.get_bind().dialect.name)
+            .values(values)
+            .on_conflict_do_nothing(index_elements=["username"])
+            .returning(User.__table__.c.username)
+        )
+        try:
+            created = set((await self.db.execute(statement)).scalars().all())
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            for line_no, row in pending:
+                self._result(line_no, row["username"], FAILED, str(e))
+            return
+
+        for line_no, row in pending:
+            # Имя могли занять параллельно между проверкой и вставкой
+            self._result(line_no, row["username"], CREATED if row["username"] in created else EXISTS)
+
+    async def _hash(self, password: str) -> str:
+        async with self._hash_slots:
+            while True:
+                try:
+                    return await self.hasher.hash(password)
+                except PasswordPoolSaturated:
+                    # Пул занят входами пользователей — уступаем и повторяем
+                    await asyncio.sleep(0.05)
+
+    def _result(self, line_no: int, username: Optional[str], status: str, detail: Optional[str] = None) -> None:
+        entry = {"line": line_no, "username": username, "status": status}
+        if detail:
+            entry["detail"] = detail
+        self.report.append(entry)
+
+
+async def import_users(db: AsyncSession, chunks: AsyncIterator[bytes], fmt: str, **options) -> dict:
+    """Импортирует пользователей из потока CSV или NDJSON и возвращает построчный отчёт."""
+    if fmt not in (CSV, NDJSON):
+        raise ValueError(f"Unsupported import format: {fmt}")
+    return await UserImporter(db, **options).run(iter_rows(iter_lines(chunks), fmt))
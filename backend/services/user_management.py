@@ -1,22 +1,14 @@
 from fastapi import HTTPException
 from backend.models import Role, User
-from passlib.context import CryptContext
 from backend.schemas import RoleAssignmentRequest, UserCreate
+from backend.services.password_hasher import password_hasher
+from backend.services.principal_cache import principal_cache
 from sqlalchemy.ext.asyncio import AsyncSession
-
-# Создаем контекст для хэширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Тестирование хэширования и проверки
-password = "my_secure_password"
-hashed = pwd_context.hash(password)
-print("Hashed password:", hashed)
-
-assert pwd_context.verify(password, hashed), "Password verification failed"
+from sqlalchemy.sql import text
 
 # Асинхронная регистрация нового пользователя
 async def register_user(user: UserCreate, db: AsyncSession):
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     await db.execute(
         text("INSERT INTO users (username, hashed_password, role, is_active) "
              "VALUES (:username, :hashed_password, :role, :is_active)"),
@@ -37,15 +29,38 @@ async def assign_role(request: RoleAssignmentRequest, db: AsyncSession, admin_us
     if admin_user.role != Role.ADMIN.value:
         raise HTTPException(status_code=403, detail="Только администратор может назначать роли")
 
-    result = await db.execute(text(
-        f"SELECT * FROM users WHERE username='{request.username}'"))
+    result = await db.execute(
+        text("SELECT * FROM users WHERE username = :username"), {"username": request.username}
+    )
     user = result.fetchone()
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
     await db.execute(
-        text(f"UPDATE users SET role='{request.role.value}' WHERE username='{request.username}'")
+        text("UPDATE users SET role = :role WHERE username = :username"),
+        {"role": request.role.value, "username": request.username},
     )
     await db.commit()
+    principal_cache.invalidate(request.username)
 
     return {"message": f"Роль {request.role} назначена пользователю {request.username}"}
+
+
+# Асинхронная деактивация пользователя (только для админа)
+async def deactivate_user(username: str, db: AsyncSession, admin_user: User):
+    """
+    Помечает пользователя неактивным и сбрасывает его запись в кэше аутентификации.
+    """
+    if admin_user.role != Role.ADMIN.value:
+        raise HTTPException(status_code=403, detail="Только администратор может деактивировать пользователей")
+
+    result = await db.execute(
+        text("UPDATE users SET is_active = :is_active WHERE username = :username"),
+        {"is_active": False, "username": username},
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+    await db.commit()
+    principal_cache.invalidate(username)
+
+    return {"message": f"Пользователь {username} деактивирован"}
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Optional
+
+from backend.utils.config import settings
+from backend.utils.database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Доставка сообщения получателю, подключённому к текущему процессу
+Deliver = Callable[[str, dict], Awaitable[None]]
+
+
+class InProcessBroker:
+    """
+    Брокер в пределах одного процесса: сообщение сразу передаётся локальной доставке.
+
+    Подходит для запуска с одним воркером uvicorn.
+    """
+
+    def __init__(self) -> None:
+        self._deliver: Optional[Deliver] = None
+        self.published = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, recipient_id: str, message: dict) -> None:
+        self.published += 1
+        if self._deliver is not None:
+            await self._deliver(recipient_id, message)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+    def stats(self) -> dict:
+        return {"broker": "memory", "published": self.published}
+
+
+class PostgresBroker:
+    """
+    Брокер между процессами через LISTEN/NOTIFY PostgreSQL.
+
+    Каждый воркер слушает общий канал на выделенном соединении и доставляет сообщения
+    получателям, чьи сокеты подключены к нему. Публикация идёт через отдельное соединение.
+    Полезная нагрузка NOTIFY ограничена ~8000 байтами, более длинные сообщения отклоняются.
+    """
+
+    MAX_PAYLOAD = 7999
+
+    def __init__(self, dsn: str, channel: str = "ws_messages", reconnect_delay: float = 1.0) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._deliver: Optional[Deliver] = None
+        self._listen_conn = None
+        self._publish_conn = None
+        self._publish_lock = asyncio.Lock()
+        self._tasks = set()
+        self._stopping = False
+        self.published = 0
+        self.received = 0
+        self.rejected = 0
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+        self._stopping = False
+        await self._listen()
+
+    async def publish(self, recipient_id: str, message: dict) -> None:
+        payload = json.dumps({"to": recipient_id, "message": message})
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            self.rejected += 1
+            raise ValueError("Message is too large for the websocket broker")
+        async with self._publish_lock:
+            if self._publish_conn is None or self._publish_conn.is_closed():
+                self._publish_conn = await self._connect()
+            await self._publish_conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        self.published += 1
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        self._listen_conn = self._publish_conn = None
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "broker": "postgres",
+            "channel": self.channel,
+            "published": self.published,
+            "received": self.received,
+            "rejected": self.rejected,
+        }
+
+    async def _connect(self):
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _listen(self) -> None:
+        self._listen_conn = await self._connect()
+        self._listen_conn.add_termination_listener(self._on_terminated)
+        await self._listen_conn.add_listener(self.channel, self._on_notify)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.received += 1
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed websocket broker payload on %s", channel)
+            return
+        self._spawn(self._deliver(envelope["to"], envelope["message"]))
+
+    def _on_terminated(self, connection) -> None:
+        if not self._stopping:
+            logger.error("Websocket broker connection lost, reconnecting")
+            self._spawn(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while not self._stopping:
+            try:
+                await self._listen()
+                return
+            except Exception as e:
+                logger.error("Websocket broker reconnect failed: %s", e)
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def create_broker(kind: str, database_url: str = ""):
+    """
+    Создаёт брокер доставки сообщений websocket.
+
+    :param kind: "memory" — в пределах процесса, "postgres" — между процессами через LISTEN/NOTIFY
+    """
+    if kind == "memory":
+        return InProcessBroker()
+    if kind == "postgres":
+        # asyncpg принимает DSN без указания драйвера SQLAlchemy
+        return PostgresBroker(database_url.replace("postgresql+asyncpg://", "postgresql://", 1))
+    raise ValueError(f"Unknown websocket broker: {kind}")
+
+
+ws_broker = create_broker(settings.WS_BROKER, DATABASE_URL)
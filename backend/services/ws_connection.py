@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from backend.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Политики переполнения очереди исходящих сообщений
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+# Задержка от постановки сообщения в очередь до его отправки, по всем соединениям
+send_lag = Histogram()
+
+
+class ClientConnection:
+    """
+    Websocket-соединение с ограниченной очередью исходящих сообщений.
+
+    Отправитель только ставит сообщение в очередь и не ждёт медленного получателя;
+    отправкой занимается отдельная задача-писатель. При переполнении очереди либо
+    отбрасывается самое старое сообщение (drop_oldest), либо соединение закрывается
+    (disconnect).
+    """
+
+    def __init__(self, user_id, websocket, maxsize: int = 100, policy: str = DROP_OLDEST) -> None:
+        if policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.user_id = user_id
+        self.websocket = websocket
+        self.policy = policy
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+
+    def start(self) -> None:
+        self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    def enqueue(self, message: dict) -> bool:
+        """Ставит сообщение в очередь без ожидания; False — сообщение не принято."""
+        if self.closed:
+            return False
+        item = (time.perf_counter(), message)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == DISCONNECT:
+            logger.warning("Outbound queue of user %s is full, disconnecting", self.user_id)
+            self.dropped += 1
+            self._close(code=1013, reason="Outbound queue overflow")
+            return False
+
+        self._queue.get_nowait()
+        self.dropped += 1
+        self._queue.put_nowait(item)
+        return True
+
+    async def stop(self) -> None:
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "policy": self.policy,
+            "queued": self._queue.qsize(),
+            "maxsize": self._queue.maxsize,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "last_lag_ms": self.last_lag * 1000,
+            "max_lag_ms": self.max_lag * 1000,
+            "avg_lag_ms": self._total_lag / self.sent * 1000 if self.sent else 0.0,
+        }
+
+    async def _write_loop(self) -> None:
+        while True:
+            enqueued, message = await self._queue.get()
+            try:
+                await self.websocket.send_json(message)
+            except Exception as e:
+                logger.warning("Failed to send message to %s: %s", self.user_id, e)
+                self.closed = True
+                return
+            lag = time.perf_counter() - enqueued
+            send_lag.observe(lag)
+            self.sent += 1
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._total_lag += lag
+
+    def _close(self, code: int, reason: str) -> None:
+        self.closed = True
+        if self._writer is not None:
+            self._writer.cancel()
+        self._closer = asyncio.get_running_loop().create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: str) -> None:
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            # Сокет уже закрыт клиентом
+            pass
@@ -24,10 +24,78 @@ class Settings:
         f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
 
+    # Пул соединений: размер, переполнение, пересоздание соединений (сек), ожидание соединения (сек).
+    # DB_POOL_PRE_PING=true возвращает проверку соединения при каждой выдаче из пула
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+
+    # Метрики Prometheus (/metrics) по умолчанию доступны только с локального адреса
+    METRICS_ALLOW_REMOTE: bool = os.getenv("METRICS_ALLOW_REMOTE", "false").lower() in ("1", "true", "yes")
+
+    # Логирование: общий уровень, уровни отдельных логгеров ("имя=УРОВЕНЬ" через запятую)
+    # и формат вывода: json — строка JSON на запись, text — обычный текст
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "sqlalchemy.engine=WARNING,uvicorn.access=WARNING")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+
     # JWT настройки
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
 
+    # Кэш аутентифицированных пользователей (AUTH_CACHE_TTL=0 — кэш выключен)
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", 30))
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", 1024))
+
+    # Пул хэширования паролей: число потоков и максимум принятых заданий (сверх — 503)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+    # Сколько паролей импорт пользователей хэширует одновременно
+    # (0 — половина PASSWORD_HASH_WORKERS, но не меньше двух)
+    USER_IMPORT_HASH_CONCURRENCY: int = int(os.getenv("USER_IMPORT_HASH_CONCURRENCY", 0))
+
+    # Майнинг: число процессов для proof-of-work (1 — последовательный режим)
+    MINING_WORKERS: int = int(os.getenv("MINING_WORKERS", 1))
+    # Максимальное число заданий в очереди майнинга (при переполнении — 429)
+    MINING_QUEUE_SIZE: int = int(os.getenv("MINING_QUEUE_SIZE", 100))
+    # Сложность proof-of-work в битах и целевое время блока в секундах (0 — сложность фиксирована)
+    MINING_DIFFICULTY: int = int(os.getenv("MINING_DIFFICULTY", 16))
+    MINING_TARGET_BLOCK_TIME: float = float(os.getenv("MINING_TARGET_BLOCK_TIME", 0))
+    MINING_DIFFICULTY_WINDOW: int = int(os.getenv("MINING_DIFFICULTY_WINDOW", 10))
+    # Минимальная сложность блоков при проверке цепочки (по умолчанию — MINING_DIFFICULTY);
+    # понижать её нужно, если сложность повышали, а старые блоки майнились с меньшей
+    MINING_MIN_DIFFICULTY: int = int(os.getenv("MINING_MIN_DIFFICULTY", MINING_DIFFICULTY))
+    # Схема proof-of-work для новых блоков: 1 — исходная, 2 — с хэшированием префикса блока
+    MINING_POW_VERSION: int = int(os.getenv("MINING_POW_VERSION", 2))
+    # Пакетирование записей: блок запечатывается при MEMPOOL_BATCH_SIZE записях
+    # или когда старейшая запись ждёт MEMPOOL_MAX_AGE секунд (0 — без порога времени)
+    MEMPOOL_BATCH_SIZE: int = int(os.getenv("MEMPOOL_BATCH_SIZE", 1))
+    MEMPOOL_MAX_AGE: float = float(os.getenv("MEMPOOL_MAX_AGE", 0))
+    # Каталог хранилища блоков (пусто — цепочка только в памяти) и частота fsync
+    BLOCKCHAIN_DATA_DIR: str = os.getenv("BLOCKCHAIN_DATA_DIR", "")
+    BLOCKCHAIN_FSYNC_EVERY: int = int(os.getenv("BLOCKCHAIN_FSYNC_EVERY", 32))
+    # Файл ключей шифрования (по умолчанию keys.json в каталоге хранилища блоков;
+    # без обоих путей ключ живёт только в памяти) и число потоков пакетного шифрования
+    ENCRYPTION_KEYRING_PATH: str = os.getenv(
+        "ENCRYPTION_KEYRING_PATH",
+        os.path.join(BLOCKCHAIN_DATA_DIR, "keys.json") if BLOCKCHAIN_DATA_DIR else "",
+    )
+    ENCRYPTION_WORKERS: int = int(os.getenv("ENCRYPTION_WORKERS", 4))
+
+    # Доставка сообщений websocket: memory — в пределах процесса,
+    # postgres — между воркерами через LISTEN/NOTIFY
+    WS_BROKER: str = os.getenv("WS_BROKER", "memory")
+    # Очередь исходящих сообщений каждого соединения и политика при её переполнении:
+    # drop_oldest — отбросить самое старое сообщение, disconnect — закрыть соединение
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", 100))
+    WS_OVERFLOW_POLICY: str = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+    # Пакетная запись сообщений чата: запись при MESSAGE_BATCH_SIZE сообщениях
+    # или через MESSAGE_FLUSH_INTERVAL секунд после первого сообщения в буфере
+    MESSAGE_BATCH_SIZE: int = int(os.getenv("MESSAGE_BATCH_SIZE", 100))
+    MESSAGE_FLUSH_INTERVAL: float = float(os.getenv("MESSAGE_FLUSH_INTERVAL", 0.05))
+
     # Вспомогательные свойства
     @property
     def access_token_expire_delta(self) -> timedelta:
@@ -1,9 +1,15 @@
 import os
+import time
 
 from dotenv import load_dotenv
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
                                     create_async_engine)
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from backend.utils.config import settings
+from backend.utils.metrics import Histogram, record_phase
 
 # Загружаем переменные окружения из .env
 load_dotenv()
@@ -19,14 +25,71 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 
+# Время ожидания свободного соединения из пула
+checkout_wait = Histogram()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, который замеряет время ожидания соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_wait.observe(time.perf_counter() - started)
+
+
+def _pool_options(url: str) -> dict:
+    # SQLite работает без пула соединений (NullPool), настройки пула к нему не применяются.
+    # Вместо pre-ping на каждую выдачу соединения используется оптимистичная стратегия:
+    # соединения пересоздаются по pool_recycle, а при ошибке разрыва SQLAlchemy
+    # инвалидирует пул, и следующий запрос получает новое соединение.
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
 # Создаем асинхронный движок SQLAlchemy
 engine: AsyncEngine = create_async_engine(
     DATABASE_URL,
     echo=False,  # Установите True для отладки SQL-запросов
     future=True,
-    pool_pre_ping=True  # Проверка соединения перед выполнением запроса
+    **_pool_options(DATABASE_URL),
 )
 
+
+def instrument_engine(sync_engine) -> None:
+    """Относит время выполнения SQL-запросов движка к фазе db текущего запроса."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_phase("db", time.perf_counter() - conn.info["query_started"].pop())
+
+    # При ошибке запроса after_cursor_execute не вызывается: без этого отметка начала
+    # осталась бы на соединении и исказила бы замер следующего запроса
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        started = conn.info.get("query_started") if conn is not None else None
+        if started:
+            record_phase("db", time.perf_counter() - started.pop())
+
+
+instrument_engine(engine.sync_engine)
+
+
 # Настраиваем асинхронную фабрику сессий
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -51,3 +114,19 @@ async def get_db():
             raise e
         finally:
             await session.close()
+
+
+def pool_status(db_engine: AsyncEngine = None) -> dict:
+    """Состояние пула соединений: занятые, свободные и сверхлимитные соединения."""
+    pool = (db_engine or engine).sync_engine.pool
+    status = {"pool_class": type(pool).__name__, "checkout_wait": checkout_wait.snapshot()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    return status
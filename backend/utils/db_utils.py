@@ -0,0 +1,61 @@
+import json
+from typing import AsyncIterator, Callable, Optional
+
+from sqlalchemy.future import select
+
+from backend.utils.database import AsyncSessionLocal
+
+# Размер страницы по умолчанию и верхняя граница для параметра limit
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Заголовок, в котором возвращается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+async def keyset_page(db, key_column, columns: list, after: Optional[int] = None,
+                      limit: int = DEFAULT_PAGE_SIZE, where=None):
+    """
+    Выбирает страницу строк по возрастанию ключа (keyset-пагинация).
+
+    В отличие от OFFSET, база сразу переходит по индексу к ключу `after`, поэтому
+    стоимость запроса не растёт с номером страницы.
+
+    :param key_column: Уникальный упорядочивающий столбец (обычно первичный ключ)
+    :param columns: Выбираемые столбцы; key_column должен быть среди них
+    :param after: Ключ последней строки предыдущей страницы
+    :return: Кортеж (строки, курсор следующей страницы или None)
+    """
+    query = select(*columns).order_by(key_column).limit(limit + 1)
+    if after is not None:
+        query = query.where(key_column > after)
+    if where is not None:
+        query = query.where(where)
+
+    rows = (await db.execute(query)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], key_column.key)
+
+
+async def stream_json_array(key_column, columns: list, to_dict: Callable,
+                            batch_size: int = MAX_PAGE_SIZE, where=None) -> AsyncIterator[bytes]:
+    """
+    Отдаёт все строки таблицы JSON-массивом по частям, страница за страницей.
+
+    Использует собственную сессию: ответ передаётся уже после выхода из обработчика.
+    """
+    yield b"["
+    first = True
+    after = None
+    async with AsyncSessionLocal() as db:
+        while True:
+            rows, after = await keyset_page(db, key_column, columns, after, batch_size, where)
+            if rows:
+                chunk = ",".join(json.dumps(to_dict(row)) for row in rows)
+                yield (chunk if first else "," + chunk).encode()
+                first = False
+            if after is None:
+                break
+    yield b"]"
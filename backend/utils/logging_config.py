@@ -0,0 +1,94 @@
+import datetime as dt
+import json
+import logging
+import queue
+import sys
+from datetime import timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Атрибуты LogRecord, которые не считаются пользовательскими полями (extra=...);
+# color_message — копия сообщения с ANSI-цветами, которую добавляет uvicorn
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "color_message"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON; поля из extra=... попадают в объект как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": dt.datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler, который в вызывающем потоке только подставляет аргументы в сообщение.
+
+    Стандартный prepare() форматирует запись целиком; здесь форматирование (JSON) и
+    вывод выполняет поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec: str) -> dict:
+    """Разбирает строку вида "backend.routers=DEBUG,sqlalchemy.engine=WARNING"."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str = "INFO", module_levels: Optional[dict] = None, fmt: str = "json",
+                  stream=None) -> QueueListener:
+    """
+    Настраивает асинхронный вывод логов: обработчики логгеров только кладут записи
+    в очередь, а форматирует и пишет их фоновый поток.
+
+    :param module_levels: Уровни отдельных логгеров, например {"sqlalchemy.engine": "WARNING"}
+    :param fmt: "json" — JSON-строки, "text" — обычный текст
+    :return: Запущенный QueueListener; остановить его нужно при завершении приложения
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    # uvicorn настраивает свои обработчики до запуска приложения; без них записи
+    # uvicorn идут через общую очередь и не дублируются
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener = QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,110 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Границы корзин по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными корзинами (как в Prometheus).
+
+    observe() можно вызывать из разных потоков.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[position] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative(self) -> list:
+        """Пары (верхняя граница, число наблюдений не больше неё); последняя граница — inf."""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): count
+                        for bound, count in self.cumulative()},
+        }
+
+
+# Фазы обработки запроса, время которых учитывается отдельно
+PHASES = ("db", "bcrypt", "pow", "template")
+
+# Длительность фаз по всем запросам и фоновым заданиям
+phase_duration = {phase: Histogram() for phase in PHASES}
+
+# Время фаз текущего запроса: словарь фаза → секунды (None вне запроса).
+# Контекст копируется в пулы потоков (см. MiningScheduler, PasswordHasher),
+# поэтому время, потраченное в них, тоже относится к запросу
+request_phases: ContextVar[Optional[dict]] = ContextVar("request_phases", default=None)
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    phase_duration[phase].observe(seconds)
+    phases = request_phases.get()
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def span(phase: str):
+    """Замеряет время блока кода и относит его к фазе `phase`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def render_histogram(name: str, help_text: str, series: list) -> list:
+    """
+    Строки гистограммы в текстовом формате Prometheus.
+
+    :param series: Пары (метки, Histogram)
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        for bound, count in histogram.cumulative():
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{{{_labels(dict(labels, le=le))}}} {count}")
+        suffix = f"{{{_labels(labels)}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {histogram.sum}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
+
+
+def render_counter(name: str, help_text: str, series: list) -> list:
+    """Строки счётчика в текстовом формате Prometheus; series — пары (метки, значение)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for labels, value in series:
+        lines.append(f"{name}{{{_labels(labels)}}} {value}")
+    return lines
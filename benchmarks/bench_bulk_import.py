@@ -0,0 +1,113 @@
+"""
+Бенчмарк массового импорта пользователей: регистрация по одному против UserImporter.
+
+Запуск из корня проекта:
+    python benchmarks/bench_bulk_import.py --rows 2000 --rounds 12 --workers 4
+
+before — путь /auth/register для каждой строки: проверка существования, bcrypt, INSERT, COMMIT;
+after  — import_users: пакетная проверка имён, параллельный bcrypt на пуле потоков,
+         многострочный INSERT ... ON CONFLICT DO NOTHING и один COMMIT на пакет.
+Используется временная база SQLite; --rounds задаёт стоимость bcrypt (в приложении — 12).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from passlib.context import CryptContext  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+
+from backend.services.password_hasher import PasswordHasher  # noqa: E402
+from backend.services.user_import import NDJSON, import_users  # noqa: E402
+from backend.utils.database import Base  # noqa: E402
+
+
+async def fresh_engine(path: str):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+async def register_one_by_one(engine, hasher: PasswordHasher, rows: list) -> None:
+    async with AsyncSession(engine) as db:
+        for row in rows:
+            existing = await db.execute(text("SELECT * FROM users WHERE username = :username"),
+                                        {"username": row["username"]})
+            if existing.fetchone():
+                continue
+            hashed = await hasher.hash(row["password"])
+            await db.execute(
+                text("INSERT INTO users (username, hashed_password, role, is_active) "
+                     "VALUES (:username, :hashed_password, :role, :is_active)"),
+                {"username": row["username"], "hashed_password": hashed, "role": "user", "is_active": True},
+            )
+            await db.commit()
+
+
+async def bulk_import(engine, hasher: PasswordHasher, rows: list, batch_size: int) -> dict:
+    payload = "\n".join(json.dumps(row) for row in rows).encode()
+
+    async def chunks():
+        for start in range(0, len(payload), 64 * 1024):
+            yield payload[start:start + 64 * 1024]
+
+    async with AsyncSession(engine) as db:
+        return await import_users(db, chunks(), NDJSON, hasher=hasher, batch_size=batch_size)
+
+
+async def measure(args) -> dict:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds)
+    hasher = PasswordHasher(context, workers=args.workers, max_pending=args.workers * 4)
+    rows = [{"username": f"employee{i}", "password": f"secret-{i}"} for i in range(args.rows)]
+    result = {"rows": args.rows, "rounds": args.rounds, "workers": args.workers}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = await fresh_engine(os.path.join(tmp, "before.db"))
+        started = time.perf_counter()
+        await register_one_by_one(engine, hasher, rows)
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+        result["before"] = {"seconds": elapsed, "rows_per_second": args.rows / elapsed}
+
+        engine = await fresh_engine(os.path.join(tmp, "after.db"))
+        started = time.perf_counter()
+        summary = await bulk_import(engine, hasher, rows, args.batch_size)
+        elapsed = time.perf_counter() - started
+        await engine.dispose()
+        assert summary["counts"] == {"created": args.rows}, summary["counts"]
+        result["after"] = {"seconds": elapsed, "rows_per_second": args.rows / elapsed}
+
+    hasher.shutdown()
+    result["speedup"] = result["after"]["rows_per_second"] / result["before"]["rows_per_second"]
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="password hashing threads")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = asyncio.run(measure(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{'':<8} {'seconds':>10} {'rows/s':>10}")
+    for name in ("before", "after"):
+        print(f"{name:<8} {result[name]['seconds']:>10.2f} {result[name]['rows_per_second']:>10.1f}")
+    print(f"speedup: {result['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Микробенчмарк запросов к цепочке: разбор JSON при каждом запросе против индексов
+и однократно разобранных записей блоков.
+
+Запуск из корня проекта:
+    python benchmarks/bench_queries.py --blocks 100000 --queries 200
+
+before — прежний способ: обход цепочки с конца с json.loads(block.data) для каждого блока;
+after  — текущий Blockchain: индексы по issue/типу и записи Block.records.
+"""
+import argparse
+import datetime as _dt
+import json as _json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.blockchain.block import Block  # noqa: E402
+from backend.blockchain.blockchain_func import Blockchain  # noqa: E402
+
+
+def build_chain(size: int, issues: int) -> Blockchain:
+    # Блоки добавляются без proof-of-work: измеряются только запросы
+    blockchain = Blockchain()
+    for index in range(1, size):
+        if index % 10 == 0:
+            record = {"type": "vote", "issue": f"issue-{index % issues}", "votes": {"u1": "yes", "u2": "no"}}
+        else:
+            record = {"type": "security_event", "event": f"event {index}"}
+        batch = {"type": "batch", "merkle_root": "", "transactions": [record]}
+        previous = blockchain.chain[-1]
+        blockchain._append_block(Block(index=index, timestamp=str(_dt.datetime.now()), data=_json.dumps(batch),
+                                       proof=1, previous_hash=previous.hash))
+    return blockchain
+
+
+def legacy_vote_results(blockchain: Blockchain, issue: str) -> dict:
+    for block in reversed(blockchain.chain):
+        try:
+            payload = _json.loads(block.data)
+        except ValueError:
+            continue
+        for record in reversed(payload.get("transactions", [])):
+            if record.get("type") == "vote" and record.get("issue") == issue:
+                return record["votes"]
+    return {}
+
+
+def legacy_vote_count(blockchain: Blockchain) -> int:
+    total = 0
+    for block in blockchain.chain:
+        try:
+            payload = _json.loads(block.data)
+        except ValueError:
+            continue
+        total += sum(len(r["votes"]) for r in payload.get("transactions", []) if r.get("type") == "vote")
+    return total
+
+
+def indexed_vote_count(blockchain: Blockchain) -> int:
+    return sum(len(r.get("votes")) for b in blockchain.get_blocks_by_type("vote") for r in b.records if r.type == "vote")
+
+
+def rate(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return repeat / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=100_000)
+    parser.add_argument("--issues", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    blockchain = build_chain(args.blocks, args.issues)
+    blockchain.rebuild_indexes()
+    issues = [f"issue-{random.randrange(args.issues)}" for _ in range(args.queries)]
+
+    scans = max(1, args.queries // 50)
+    rows = [
+        ("vote lookup", rate(lambda: [legacy_vote_results(blockchain, i) for i in issues], 1) * len(issues),
+         rate(lambda: [blockchain.get_vote_results(i) for i in issues], 1) * len(issues)),
+        ("vote tally (full scan)", rate(lambda: legacy_vote_count(blockchain), scans),
+         rate(lambda: indexed_vote_count(blockchain), scans)),
+    ]
+
+    print(f"chain: {args.blocks} blocks, {args.issues} issues")
+    print(f"{'query':<24} {'before ops/s':>14} {'after ops/s':>14} {'speedup':>9}")
+    for name, before, after in rows:
+        print(f"{name:<24} {before:>14.1f} {after:>14.1f} {after / before:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк восстановления цепочки из SegmentStore в зависимости от её длины.
+
+Запуск из корня проекта:
+    python benchmarks/bench_recovery.py --sizes 1000 10000 100000
+
+Для каждой длины цепочка записывается во временный каталог (proof-of-work не считается,
+отметка проверенной высоты ставится на вершину), затем измеряется:
+  open_ms    — открытие хранилища (загрузка индекса и досканирование хвоста);
+  resume_ms  — создание Blockchain поверх открытого хранилища;
+  rehash_ms  — для сравнения: полный пересчёт хэшей всех блоков, как при аудите.
+"""
+import argparse
+import datetime as _dt
+import json as _json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.blockchain.block import Block  # noqa: E402
+from backend.blockchain.blockchain_func import Blockchain  # noqa: E402
+from backend.blockchain.storage import SegmentStore  # noqa: E402
+
+
+def build_chain(path: str, size: int) -> None:
+    store = SegmentStore(path, fsync_every=1024)
+    previous_hash = "0"
+    for index in range(size):
+        record = {"type": "security_event", "event": f"event {index}", "timestamp": str(_dt.datetime.now())}
+        block = Block(index=index, timestamp=str(_dt.datetime.now()), data=_json.dumps(record),
+                      proof=index + 1, previous_hash=previous_hash)
+        store.append(block.payload)
+        previous_hash = block.hash
+    store.save_checkpoint(size - 1)
+    store.close()
+
+
+def measure(size: int) -> dict:
+    with tempfile.TemporaryDirectory() as path:
+        build_chain(path, size)
+
+        started = time.perf_counter()
+        store = SegmentStore(path)
+        opened = time.perf_counter()
+        blockchain = Blockchain(store=store)
+        resumed = time.perf_counter()
+        for block in blockchain.chain:
+            block.compute_hash()
+        rehashed = time.perf_counter()
+
+        assert len(blockchain.chain) == size and blockchain.verified_height == size - 1
+        store.close()
+
+    return {
+        "blocks": size,
+        "open_ms": (opened - started) * 1000,
+        "resume_ms": (resumed - opened) * 1000,
+        "rehash_ms": (rehashed - resumed) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'blocks':>10} {'open_ms':>10} {'resume_ms':>10} {'rehash_ms':>10}")
+    for size in args.sizes:
+        result = measure(size)
+        print(f"{result['blocks']:>10} {result['open_ms']:>10.1f} {result['resume_ms']:>10.1f} {result['rehash_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
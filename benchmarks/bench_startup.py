@@ -0,0 +1,65 @@
+"""
+Бенчмарк запуска приложения: время `import main` и время до первого ответа.
+
+Запуск из корня проекта:
+    python benchmarks/bench_startup.py --runs 5
+
+Каждый замер выполняется в отдельном процессе интерпретатора, чтобы не учитывать кэш
+уже импортированных модулей. Первый ответ — GET /login через TestClient (lifespan
+не запускается, база данных не нужна).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+response = TestClient(main.app).get("/login")
+answered = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({"import_ms": (imported - started) * 1000, "first_response_ms": (answered - started) * 1000}))
+"""
+
+
+def probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    samples = [probe() for _ in range(args.runs)]
+    result = {
+        metric: {
+            "median": statistics.median(s[metric] for s in samples),
+            "min": min(s[metric] for s in samples),
+            "max": max(s[metric] for s in samples),
+        }
+        for metric in ("import_ms", "first_response_ms")
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{'metric':<20} {'median':>10} {'min':>10} {'max':>10}")
+    for metric, values in result.items():
+        print(f"{metric:<20} {values['median']:>10.1f} {values['min']:>10.1f} {values['max']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
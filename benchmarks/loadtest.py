@@ -0,0 +1,467 @@
+"""
+Нагрузочный тест API: вход, дашборд, отправка и история сообщений чата,
+ретрансляция websocket и майнинг.
+
+Запуск из корня проекта:
+    python benchmarks/loadtest.py --concurrency 10 --duration 10 --output results.json
+    python benchmarks/loadtest.py --compare results.json --fail-threshold 20
+
+По умолчанию приложение запускается в этом же процессе (ASGI без сети) на временной
+базе SQLite; --database-url задаёт другую базу, например локальный Postgres
+(postgresql+asyncpg://...). С --base-url запросы идут к уже запущенному серверу:
+    uvicorn main:app --port 8000 &
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000
+Для websocket по сети нужен пакет websockets; без него сценарий ws_relay пропускается.
+
+Каждый сценарий выполняется --duration секунд в --concurrency параллельных воркерах.
+Для сценария считаются запросы в секунду и задержки p50/p95/p99. --output сохраняет
+результаты в JSON, --compare сравнивает с ранее сохранёнными (например, с другого коммита).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+
+PASSWORD = "bench-password"
+# Версия формата результатов; увеличивается при несовместимых изменениях полей
+RESULT_FORMAT = 1
+
+
+@dataclass
+class BenchUser:
+    username: str
+    id: Optional[int] = None
+    token: Optional[str] = None
+
+    @property
+    def headers(self) -> dict:
+        return {"Cookie": f"access_token={self.token}"}
+
+
+class Context:
+    """Общее состояние прогона: HTTP-клиент, приложение (в процессе) и пользователи."""
+
+    def __init__(self, client: httpx.AsyncClient, app=None, base_url: str = None, timeout: float = 30.0) -> None:
+        self.client = client
+        self.app = app
+        self.base_url = base_url
+        self.timeout = timeout
+        self.users = []
+
+    def pair(self, worker: int) -> tuple:
+        # У каждого воркера своя пара пользователей: отправитель и получатель
+        return self.users[2 * worker], self.users[2 * worker + 1]
+
+
+def _check(response: httpx.Response, expected: int = 200) -> httpx.Response:
+    if response.status_code != expected:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path}: HTTP {response.status_code}")
+    return response
+
+
+# Клиенты websocket
+class AsgiWebSocket:
+    """Websocket-клиент, вызывающий ASGI-приложение напрямую, без сети."""
+
+    def __init__(self, app, user: BenchUser) -> None:
+        self.app = app
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": "/ws", "raw_path": b"/ws",
+            "query_string": b"", "root_path": "", "headers": [(b"cookie", user.headers["Cookie"].encode())],
+            "client": ("127.0.0.1", 0), "server": ("loadtest", 80), "subprotocols": [],
+        }
+        self._inbound = asyncio.Queue()
+        self._outbound = asyncio.Queue()
+        self._task = None
+
+    async def connect(self) -> None:
+        self._inbound.put_nowait({"type": "websocket.connect"})
+        self._task = asyncio.create_task(self.app(self.scope, self._inbound.get, self._outbound.put))
+        message = await self._outbound.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"Websocket rejected: {message}")
+
+    async def send_json(self, data: dict) -> None:
+        self._inbound.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self) -> dict:
+        message = await self._outbound.get()
+        if message["type"] == "websocket.close":
+            raise ConnectionError(f"Websocket closed: {message.get('code')}")
+        return json.loads(message["text"])
+
+    async def close(self) -> None:
+        self._inbound.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await self._task
+
+
+class NetworkWebSocket:
+    """Websocket-клиент для запущенного сервера (пакет websockets)."""
+
+    def __init__(self, base_url: str, user: BenchUser) -> None:
+        self.url = base_url.replace("http", "ws", 1).rstrip("/") + "/ws"
+        self.user = user
+        self._socket = None
+
+    async def connect(self) -> None:
+        import websockets
+        self._socket = await websockets.connect(self.url, extra_headers=self.user.headers)
+
+    async def send_json(self, data: dict) -> None:
+        await self._socket.send(json.dumps(data))
+
+    async def receive_json(self) -> dict:
+        return json.loads(await self._socket.recv())
+
+    async def close(self) -> None:
+        await self._socket.close()
+
+
+# Сценарии
+class Scenario:
+    """Сценарий нагрузки: setup() готовит состояние воркера, request() — одна операция."""
+
+    name = ""
+
+    def unavailable(self, ctx: Context) -> Optional[str]:
+        """Причина, по которой сценарий нельзя выполнить, или None."""
+        return None
+
+    async def setup(self, ctx: Context, worker: int):
+        return ctx.pair(worker)
+
+    async def request(self, ctx: Context, state, iteration: int) -> None:
+        raise NotImplementedError
+
+    async def teardown(self, ctx: Context, state) -> None:
+        pass
+
+
+class Login(Scenario):
+    name = "login"
+
+    async def request(self, ctx, state, iteration):
+        user, _ = state
+        _check(await ctx.client.post("/auth/login", json={"username": user.username, "password": PASSWORD}))
+
+
+class Dashboard(Scenario):
+    name = "dashboard"
+
+    async def request(self, ctx, state, iteration):
+        user, _ = state
+        _check(await ctx.client.get("/dashboard", headers=user.headers))
+
+
+class ChatSend(Scenario):
+    name = "chat_send"
+
+    async def request(self, ctx, state, iteration):
+        user, partner = state
+        _check(await ctx.client.post("/api/chat/send-message", headers=user.headers,
+                                     json={"receiver_id": partner.id, "content": f"load message {iteration}"}))
+
+
+class ChatHistory(Scenario):
+    name = "chat_history"
+
+    async def request(self, ctx, state, iteration):
+        user, partner = state
+        _check(await ctx.client.get(f"/api/chat/messages/{partner.id}", headers=user.headers,
+                                    params={"limit": 50}))
+
+
+class WebSocketRelay(Scenario):
+    """Задержка от отправки сообщения одним пользователем до получения другим."""
+
+    name = "ws_relay"
+
+    def unavailable(self, ctx):
+        if ctx.app is not None:
+            return None
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            return "websockets package is not installed"
+        return None
+
+    def _socket(self, ctx, user: BenchUser):
+        return AsgiWebSocket(ctx.app, user) if ctx.app is not None else NetworkWebSocket(ctx.base_url, user)
+
+    async def setup(self, ctx, worker):
+        sender, receiver = ctx.pair(worker)
+        sender_socket, receiver_socket = self._socket(ctx, sender), self._socket(ctx, receiver)
+        await sender_socket.connect()
+        await receiver_socket.connect()
+
+        async def drain_acks():
+            # Подтверждения записи приходят отправителю; читаем их, чтобы не переполнять очередь
+            while True:
+                await sender_socket.receive_json()
+
+        return {"to": receiver.id, "sender": sender_socket, "receiver": receiver_socket,
+                "drain": asyncio.create_task(drain_acks())}
+
+    async def request(self, ctx, state, iteration):
+        await state["sender"].send_json({"to": str(state["to"]), "message": f"relay {iteration}",
+                                         "client_id": iteration})
+        while True:
+            message = await state["receiver"].receive_json()
+            if message.get("message") == f"relay {iteration}":
+                return
+
+    async def teardown(self, ctx, state):
+        state["drain"].cancel()
+        await asyncio.gather(state["drain"], return_exceptions=True)
+        await state["sender"].close()
+        await state["receiver"].close()
+
+
+class Mining(Scenario):
+    name = "mining"
+
+    async def request(self, ctx, state, iteration):
+        _check(await ctx.client.post("/blockchain/mine_block/", params={"data": f"load block {iteration}"}))
+
+
+SCENARIOS = {scenario.name: scenario for scenario in
+             (Login(), Dashboard(), ChatSend(), ChatHistory(), WebSocketRelay(), Mining())}
+
+
+# Подготовка и прогон
+async def prepare_users(ctx: Context, count: int, prefix: str) -> None:
+    ctx.users = [BenchUser(f"{prefix}_{i}") for i in range(count)]
+    for user in ctx.users:
+        response = await ctx.client.post("/auth/register", json={"username": user.username, "password": PASSWORD})
+        if response.status_code not in (200, 400):
+            _check(response)
+        response = _check(await ctx.client.post("/auth/login",
+                                                json={"username": user.username, "password": PASSWORD}))
+        user.token = response.cookies["access_token"]
+
+    ids, after_id = {}, None
+    while True:
+        params = {"limit": 1000} if after_id is None else {"limit": 1000, "after_id": after_id}
+        response = _check(await ctx.client.get("/api/chat/users", params=params))
+        ids.update((row["username"], row["id"]) for row in response.json())
+        after_id = response.headers.get("X-Next-Cursor")
+        if not after_id:
+            break
+    for user in ctx.users:
+        user.id = ids[user.username]
+
+
+def percentile(ordered: list, q: float) -> float:
+    """Перцентиль с линейной интерполяцией по отсортированному списку."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(latencies: list, errors: int, elapsed: float, first_error: Optional[str]) -> dict:
+    ordered = sorted(latencies)
+    result = {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+    if first_error:
+        result["first_error"] = first_error
+    return result
+
+
+async def run_scenario(ctx: Context, scenario: Scenario, concurrency: int, duration: float) -> dict:
+    reason = scenario.unavailable(ctx)
+    if reason:
+        return {"skipped": reason}
+
+    states = [await scenario.setup(ctx, worker) for worker in range(concurrency)]
+    latencies = []
+    errors = 0
+    first_error = None
+    deadline = time.perf_counter() + duration
+
+    async def worker(state) -> None:
+        nonlocal errors, first_error
+        iteration = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(scenario.request(ctx, state, iteration), ctx.timeout)
+            except Exception as e:
+                errors += 1
+                first_error = first_error or f"{type(e).__name__}: {e}"
+            else:
+                latencies.append(time.perf_counter() - started)
+            iteration += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(state) for state in states))
+    elapsed = time.perf_counter() - started
+    for state in states:
+        await scenario.teardown(ctx, state)
+    return summarize(latencies, errors, elapsed, first_error)
+
+
+async def run_all(ctx: Context, args) -> dict:
+    await prepare_users(ctx, 2 * args.concurrency, args.user_prefix)
+    results = {}
+    for name in args.scenarios:
+        results[name] = await run_scenario(ctx, SCENARIOS[name], args.concurrency, args.duration)
+        print(f"{name}: done", file=sys.stderr)
+    return results
+
+
+async def run_in_process(args) -> dict:
+    # Настройки приложения читаются при импорте, поэтому окружение задаётся до него
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    import main
+    from backend.utils.database import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+                return await run_all(Context(client, app=main.app, timeout=args.timeout), args)
+    finally:
+        await engine.dispose()
+
+
+async def run_remote(args) -> dict:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        return await run_all(Context(client, base_url=args.base_url, timeout=args.timeout), args)
+
+
+# Отчёт и сравнение
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict) -> None:
+    print(f"{'scenario':<14} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<14} skipped: {result['skipped']}")
+            continue
+        print(f"{name:<14} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+        if result.get("first_error"):
+            print(f"{'':<14} first error: {result['first_error']}")
+
+
+def compare(baseline: dict, current: dict, threshold: Optional[float]) -> list:
+    """
+    Печатает изменения rps и p95 относительно baseline.
+
+    :param threshold: Допустимое ухудшение в процентах (падение rps или рост p95)
+    :return: Названия сценариев, ухудшившихся сильнее порога
+    """
+    def change(before: float, after: float) -> float:
+        return (after - before) / before * 100 if before else 0.0
+
+    regressions = []
+    if baseline["meta"].get("format") != current["meta"]["format"]:
+        print(f"warning: baseline result format {baseline['meta'].get('format')} "
+              f"differs from {current['meta']['format']}")
+    print(f"\ncompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    print(f"{'scenario':<14} {'rps':>21} {'':>8} {'p95 ms':>21} {'':>8}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before or "skipped" in before or "skipped" in result:
+            continue
+        rps_change = change(before["rps"], result["rps"])
+        p95_change = change(before["p95_ms"], result["p95_ms"])
+        print(f"{name:<14} {before['rps']:>9.1f} -> {result['rps']:>8.1f} {rps_change:>+7.1f}% "
+              f"{before['p95_ms']:>9.1f} -> {result['p95_ms']:>8.1f} {p95_change:>+7.1f}%")
+        if threshold is not None and (rps_change < -threshold or p95_change > threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="URL of a running server; without it the app runs in-process")
+    parser.add_argument("--database-url", help="database for the in-process app (default: temporary SQLite)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=10, help="parallel workers per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--user-prefix", default="loadtest_user")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--fail-threshold", type=float,
+                        help="exit with status 1 if rps drops or p95 grows by more than this percentage")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    args.concurrency = max(1, args.concurrency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.base_url:
+            scenarios = asyncio.run(run_remote(args))
+        else:
+            args.database_url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'loadtest.db')}"
+            scenarios = asyncio.run(run_in_process(args))
+
+    result = {
+        "meta": {
+            "format": RESULT_FORMAT,
+            "commit": _commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "target": args.base_url or "in-process",
+            "database": None if args.base_url else args.database_url.split("://", 1)[0],
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "scenarios": scenarios,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_results(scenarios)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), result, args.fail_threshold)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -113,6 +113,11 @@ function initializeChat() {
 
     chatUserSelect.addEventListener("change", async () => {
         const selectedUserOption = chatUserSelect.selectedOptions[0];
+        if (selectedUserOption.dataset.cursor) {
+            // Пункт «Load more…» подгружает следующую страницу пользователей
+            await loadUsers(selectedUserOption.dataset.cursor);
+            return;
+        }
         const selectedUserId = selectedUserOption.value;
         const selectedUsername = selectedUserOption.textContent;
 
@@ -143,12 +148,10 @@ function initializeChat() {
                     const messages = await fetchMessageHistory(selectedUserId);
 
                     tabContent.innerHTML = "";
-                    messages.forEach(msg => {
-                        const messageElement = document.createElement("div");
-                        messageElement.classList.add("message", msg.sender === "me" ? "my-message" : "other-user");
-                        messageElement.textContent = `${msg.sender}: ${msg.content}`;
-                        tabContent.appendChild(messageElement);
-                    });
+                    messages.forEach(msg => tabContent.appendChild(createMessageElement(msg)));
+                    // Курсор для подгрузки более ранних сообщений — id самого раннего на странице
+                    tabContent.dataset.oldestId = messages.length ? messages[0].id : "";
+                    tabContent.dataset.complete = messages.length < MESSAGE_PAGE_SIZE ? "1" : "";
 
                     tabContent.scrollTop = tabContent.scrollHeight;
                 }
@@ -160,6 +163,12 @@ function initializeChat() {
             tabContent.id = `chatContent-${selectedUserId}`;
             tabContent.classList.add("tab-content");
             tabContent.style.display = "none";
+            // При прокрутке к началу истории подгружаем предыдущую страницу
+            tabContent.addEventListener("scroll", () => {
+                if (tabContent.scrollTop === 0) {
+                    loadEarlierMessages(selectedUserId, tabContent);
+                }
+            });
             chatContent.appendChild(tabContent);
 
             tabButton.click();
@@ -243,10 +252,21 @@ function initializeChat() {
 //    });
 //}
 
-// Загрузка истории сообщений
-async function fetchMessageHistory(userId) {
+// Размер страницы истории сообщений (как MESSAGE_PAGE_SIZE в chat_router)
+const MESSAGE_PAGE_SIZE = 50;
+
+function createMessageElement(msg) {
+    const messageElement = document.createElement("div");
+    messageElement.classList.add("message", msg.sender === "me" ? "my-message" : "other-user");
+    messageElement.textContent = `${msg.sender}: ${msg.content}`;
+    return messageElement;
+}
+
+// Загрузка истории сообщений: последняя страница или страница до сообщения beforeId
+async function fetchMessageHistory(userId, beforeId = null) {
     try {
-        const response = await fetch(`/api/chat/messages/${userId}`, {
+        const query = beforeId ? `?before_id=${beforeId}&limit=${MESSAGE_PAGE_SIZE}` : `?limit=${MESSAGE_PAGE_SIZE}`;
+        const response = await fetch(`/api/chat/messages/${userId}${query}`, {
             method: "GET",
             credentials: "include",
         });
@@ -263,14 +283,42 @@ async function fetchMessageHistory(userId) {
     }
 }
 
-async function loadUsers() {
+// Подгрузка более ранних сообщений в начало вкладки с сохранением позиции прокрутки
+async function loadEarlierMessages(userId, tabContent) {
+    if (tabContent.dataset.loading || tabContent.dataset.complete || !tabContent.dataset.oldestId) {
+        return;
+    }
+    tabContent.dataset.loading = "1";
     try {
-        const response = await fetch('/api/chat/users'); // Маршрут для получения пользователей
+        const messages = await fetchMessageHistory(userId, tabContent.dataset.oldestId);
+        const previousHeight = tabContent.scrollHeight;
+        const firstMessage = tabContent.firstChild;
+        messages.forEach(msg => tabContent.insertBefore(createMessageElement(msg), firstMessage));
+
+        if (messages.length) {
+            tabContent.dataset.oldestId = messages[0].id;
+        }
+        if (messages.length < MESSAGE_PAGE_SIZE) {
+            tabContent.dataset.complete = "1";
+        }
+        tabContent.scrollTop += tabContent.scrollHeight - previousHeight;
+    } finally {
+        delete tabContent.dataset.loading;
+    }
+}
+
+// Загрузка одной страницы собеседников; без курсора список начинается заново.
+// Следующая страница запрашивается только при выборе пункта «Load more…»
+async function loadUsers(afterId = null) {
+    try {
+        const url = afterId ? `/api/chat/users?after_id=${afterId}` : '/api/chat/users';
+        const response = await fetch(url); // Маршрут для получения пользователей
         if (!response.ok) {
             throw new Error(`Error fetching users: ${response.status}`);
         }
-
-        const users = await response.json(); // Преобразуем ответ в JSON
+        const users = await response.json();
+        // Курсор следующей страницы приходит в заголовке X-Next-Cursor
+        const nextCursor = response.headers.get('X-Next-Cursor');
         const userSelect = document.getElementById('chatUserSelect'); // Найти select-элемент
 
         if (!userSelect) {
@@ -278,8 +326,14 @@ async function loadUsers() {
             return;
         }
 
-        // Очищаем текущий список пользователей (если есть)
-        userSelect.innerHTML = "";
+        if (!afterId) {
+            // Очищаем текущий список пользователей (если есть)
+            userSelect.innerHTML = "";
+        }
+        const moreOption = userSelect.querySelector('option[data-cursor]');
+        if (moreOption) {
+            moreOption.remove();
+        }
 
         // Заполняем список пользователей
         users.forEach(user => {
@@ -289,6 +343,14 @@ async function loadUsers() {
             userSelect.appendChild(option);
         });
 
+        if (nextCursor) {
+            const option = document.createElement('option');
+            option.value = "";
+            option.dataset.cursor = nextCursor;
+            option.textContent = "Load more…";
+            userSelect.appendChild(option);
+        }
+
         console.log("Users loaded:", users);
     } catch (error) {
         console.error("Error loading users:", error);
@@ -1,15 +1,20 @@
+import asyncio
 import logging
 from pathlib import Path
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from passlib.context import CryptContext
 from sqlalchemy import text
 from sqlalchemy.orm import clear_mappers
-from backend.utils.database import AsyncSessionLocal, Base
+from backend.middleware.instrumentation import InstrumentationMiddleware, InstrumentedTemplates
+from backend.utils.config import settings
+from backend.utils.database import AsyncSessionLocal, Base, engine
+from backend.utils.logging_config import parse_levels, setup_logging
 from backend.models import Role, User
+from backend.services.password_hasher import password_hasher
+from backend.services.message_writer import message_writer
+from backend.services.ws_broker import ws_broker
 
 
 from backend.routers import (
@@ -18,13 +23,12 @@ from backend.routers import (
     blockchain_routes,
     dashboard_routes,
     token_routes,
+    metrics_routes,
     user_routes,
     websocket_routes,
     chat_router,
 )
 
-# Настройка логирования
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 # Настройка путей
@@ -38,11 +42,10 @@ if not static_directory.exists() or not templates_directory.exists():
     raise RuntimeError("Проверьте наличие директорий static и templates")
 
 # Lifespan для инициализации администратора
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Логи пишет фоновый поток; обработчики запросов только кладут записи в очередь
+    log_listener = setup_logging(settings.LOG_LEVEL, parse_levels(settings.LOG_LEVELS), settings.LOG_FORMAT)
 
     async with AsyncSessionLocal() as db_session:
         # Проверяем, существует ли администратор
@@ -51,7 +54,7 @@ async def lifespan(app: FastAPI):
         )
         admin_user = admin_user.fetchone()
         if not admin_user:
-            hashed_password = pwd_context.hash("admin")
+            hashed_password = await password_hasher.hash("admin")
             await db_session.execute(
                 text("INSERT INTO users (username, hashed_password, role) VALUES (:username, :password, :role)"),
                 {"username": "admin", "password": hashed_password, "role": Role.ADMIN.value},
@@ -60,20 +63,52 @@ async def lifespan(app: FastAPI):
             logger.info("Admin user created")
         else:
             logger.info("Admin user already exists")
+
+    # Цепочка открывается при запуске: занятое другим процессом хранилище блоков
+    # (StoreLocked) обнаруживается сразу, а не на первом запросе
+    blockchain_routes.get_blockchain()
+
+    # Доставка сообщений websocket получателям, подключённым к другим воркерам
+    await ws_broker.start(websocket_routes.deliver_local)
+
+    # Запечатывание пула записей по времени
+    sealer = None
+    if settings.MEMPOOL_MAX_AGE:
+        sealer = asyncio.create_task(blockchain_routes.seal_pending_periodically(settings.MEMPOOL_MAX_AGE))
     yield
+    if sealer is not None:
+        sealer.cancel()
+        await asyncio.gather(sealer, return_exceptions=True)
+    await ws_broker.stop()
+    # Дописываем сообщения чата, ещё не сброшенные в базу
+    await message_writer.stop()
+    # Дожидаемся заданий в очереди майнинга и запечатываем оставшиеся записи; ошибка
+    # здесь не должна прерывать остальную очистку
+    try:
+        await blockchain_routes.mining_scheduler.drain()
+        await blockchain_routes.mining_scheduler.submit(blockchain_routes.get_blockchain().seal_pending)
+    except Exception as e:
+        logger.error("Failed to seal pending records on shutdown: %s", e)
+    # Останавливаем очередь майнинга и пул процессов proof-of-work
+    await blockchain_routes.mining_scheduler.stop()
+    blockchain_routes.close_blockchain()
+    password_hasher.shutdown()
+    await engine.dispose()
+    # Дописываем записи, оставшиеся в очереди логов
+    log_listener.stop()
 
 
 # Создание приложения
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(InstrumentationMiddleware)
 
 # Подключение статических файлов и шаблонов
 app.mount("/static", StaticFiles(directory=static_directory), name="static")
-templates = Jinja2Templates(directory=str(templates_directory))
+templates = InstrumentedTemplates(directory=str(templates_directory))
 
-logger.info(f"Static directory being mounted: {static_directory}")
-logger.debug(f"Static directory contents: {list(static_directory.iterdir())}")
+logger.info("Static directory being mounted: %s", static_directory)
 
 # Подключение роутеров
 
@@ -86,23 +121,24 @@ app.include_router(websocket_routes.router, tags=["websocket"])
 app.include_router(token_routes.router, prefix="/token", tags=["token"])
 app.include_router(dashboard_routes.router, tags=["dashboard"])
 app.include_router(user_routes.router, prefix="/user", tags=["user"])
+app.include_router(metrics_routes.router, tags=["metrics"])
 
 # Маршруты для отображения страниц
 @app.get("/", response_class=HTMLResponse)
 async def home_page(request: Request):
-    logger.info("Rendering home page")
+    logger.debug("Rendering home page")
     return templates.TemplateResponse("index.html", {"request": request})
 
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
-    logger.info("Rendering login page")
+    logger.debug("Rendering login page")
     return templates.TemplateResponse("login.html", {"request": request})
 
 
 @app.get("/register", response_class=HTMLResponse)
 async def register_page(request: Request):
-    logger.info("Rendering register page")
+    logger.debug("Rendering register page")
     return templates.TemplateResponse("register.html", {"request": request})
 
 
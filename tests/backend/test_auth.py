@@ -0,0 +1,115 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from passlib.context import CryptContext
+from starlette.requests import Request
+from starlette.responses import RedirectResponse
+
+from backend.models import Role, User
+from backend.services import auth, user_management
+from backend.services.password_hasher import PasswordHasher, PasswordPoolSaturated
+from backend.services.principal_cache import PrincipalCache
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeSession:
+    def __init__(self, row):
+        self.row = row
+        self.queries = 0
+
+    async def execute(self, *args, **kwargs):
+        self.queries += 1
+        return FakeResult(self.row)
+
+
+def request_with_token(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"cookie", f"access_token={token}".encode())]})
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    monkeypatch.setattr(auth, "principal_cache", cache)
+    return cache
+
+
+def test_principal_cache_evicts_least_recently_used():
+    cache = PrincipalCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_principal_cache_expires_entries(monkeypatch):
+    cache = PrincipalCache(ttl=10)
+    now = [100.0]
+    monkeypatch.setattr("backend.services.principal_cache.time.monotonic", lambda: now[0])
+    cache.set("a", 1)
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+def test_get_current_user_hits_database_once(cache):
+    user = SimpleNamespace(username="alice", role="user", is_active=True)
+    db = FakeSession(user)
+    token = auth.create_access_token({"sub": "alice"})
+
+    for _ in range(3):
+        assert asyncio.run(auth.get_current_user(request_with_token(token), db)) is user
+    assert db.queries == 1
+    assert cache.stats()["hits"] == 2
+
+    cache.invalidate("alice")
+    asyncio.run(auth.get_current_user(request_with_token(token), db))
+    assert db.queries == 2
+
+def test_deactivated_user_is_redirected_on_next_request(cache, monkeypatch, sqlite_db):
+    monkeypatch.setattr(user_management, "principal_cache", cache)
+
+    async def scenario():
+        async with sqlite_db() as db:
+            db.add(User(username="alice", hashed_password="x", role="user", is_active=True))
+            await db.commit()
+            request = request_with_token(auth.create_access_token({"sub": "alice"}))
+            before = await auth.get_current_user(request, db)
+            admin = SimpleNamespace(username="admin", role=Role.ADMIN.value)
+            await user_management.deactivate_user("alice", db, admin)
+            after = await auth.get_current_user(request, db)
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before.username == "alice"
+    assert isinstance(after, RedirectResponse) and after.headers["location"] == "/login"
+
+def test_password_hasher_round_trip():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), workers=2)
+
+    async def scenario():
+        hashed = await hasher.hash("secret")
+        return hashed, await hasher.verify("secret", hashed), await hasher.verify("wrong", hashed)
+
+    hashed, ok, wrong = asyncio.run(scenario())
+    assert hashed.startswith("$2b$") and ok and not wrong
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+def test_password_hasher_rejects_when_saturated():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), workers=1, max_pending=2)
+
+    async def scenario():
+        return await asyncio.gather(*(hasher.hash("secret") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, PasswordPoolSaturated) for r in results) == 1
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
@@ -1,6 +1,22 @@
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
 import pytest
+from cryptography.fernet import Fernet
+from block import Block
+from encryption import KeyRing
 from blockchain_func import Blockchain
-from models import Role, User
+from mining import POW_V1, POW_V2, ParallelMiner, SerialMiner, next_difficulty
+from scheduler import MiningQueueFull, MiningScheduler
+from storage import SegmentStore, StoreLocked
+from backend.blockchain.utils import merkle_root
+from backend.models import Role, User
 
 
 @pytest.fixture
@@ -39,6 +55,47 @@ def test_add_contract_change(blockchain, regular_user):
     blockchain.add_contract_change(regular_user, contract_data)
     assert len(blockchain.chain) > 1  # проверка, что новый блок был добавлен
 
+def test_contract_details_are_encrypted_in_block(blockchain, regular_user, admin_user):
+    contract_data = {"position": "developer", "salary": "1000"}
+    blockchain.add_contract_change(regular_user, contract_data)
+
+    record = json.loads(blockchain.chain[-1].data)["transactions"][0]
+    assert "salary" not in blockchain.chain[-1].data
+    assert record["username"] == "user" and "details" not in record
+    assert blockchain.is_chain_valid(full=True)
+    assert [b.index for b in blockchain.get_contract_change_blocks("user")] == [1]
+
+    history = blockchain.get_contract_details("user", admin_user)
+    assert history == [{"block": 1, "contract_hash": record["contract_hash"], "details": contract_data,
+                        "verified": True}]
+    assert blockchain.get_contract_details("user", regular_user) == history
+    with pytest.raises(PermissionError):
+        blockchain.get_contract_details("user", User(username="other", role=Role.USER))
+
+def test_contract_details_readable_while_block_is_mined(admin_user, regular_user):
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingMiner:
+        workers = 1
+
+        def find_proof(self, *args, **kwargs):
+            started.set()
+            release.wait(5)
+            return SerialMiner().find_proof(*args, **kwargs)
+
+    blockchain = Blockchain(miner=BlockingMiner(), difficulty=8)
+    blockchain.add_user(regular_user)
+    writer = threading.Thread(target=blockchain.add_contract_change, args=(regular_user, {"salary": "1000"}))
+    writer.start()
+    assert started.wait(5)
+    try:
+        # Записи уже взяты из пула в блок, но блок ещё майнится
+        assert [entry["block"] for entry in blockchain.get_contract_details("user", admin_user)] == [None]
+    finally:
+        release.set()
+        writer.join(5)
+    assert [entry["block"] for entry in blockchain.get_contract_details("user", admin_user)] == [1]
+
 def test_create_vote(blockchain):
     votes = {"voter1": "yes", "voter2": "no"}
     blockchain.create_vote("test_issue", votes)
@@ -50,3 +107,367 @@ def test_close_vote(blockchain):
     blockchain.create_vote("test_issue", votes)
     results = blockchain.close_vote("test_issue")
     assert results == votes
+
+def test_parallel_miner_matches_serial():
+    miner = ParallelMiner(workers=2, chunk_size=1024)
+    try:
+        for index, data in enumerate(["Genesis", "block data", '{"type": "vote"}'], start=1):
+            assert miner.find_proof(1, index, data) == SerialMiner().find_proof(1, index, data)
+    finally:
+        miner.close()
+
+def test_mine_block_with_parallel_miner():
+    miner = ParallelMiner(workers=2, chunk_size=1024)
+    try:
+        blockchain = Blockchain(miner=miner)
+        blockchain.mine_block("New block data")
+        assert blockchain.is_chain_valid()
+    finally:
+        miner.close()
+
+def test_mining_scheduler_runs_jobs_in_order():
+    scheduler = MiningScheduler(maxsize=10)
+    blockchain = Blockchain()
+
+    async def scenario():
+        first = scheduler.submit_nowait(blockchain.mine_block, "first")
+        second = await scheduler.submit(blockchain.mine_block, "second")
+        await first
+        await scheduler.stop()
+        return second
+
+    block = asyncio.run(scenario())
+    assert block["index"] == 2
+    assert [b.data for b in blockchain.chain[1:]] == ["first", "second"]
+
+def test_mining_scheduler_rejects_when_full():
+    scheduler = MiningScheduler(maxsize=1)
+
+    async def scenario():
+        scheduler.submit_nowait(time.sleep, 0.05)
+        await asyncio.sleep(0)  # обработчик забирает первое задание
+        scheduler.submit_nowait(time.sleep, 0.05)
+        with pytest.raises(MiningQueueFull):
+            scheduler.submit_nowait(time.sleep, 0.05)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+def test_mining_scheduler_drain_waits_for_queued_jobs():
+    scheduler = MiningScheduler(maxsize=10)
+    done = []
+
+    async def scenario():
+        for i in range(3):
+            scheduler.submit_nowait(lambda i=i: time.sleep(0.01) or done.append(i))
+        await scheduler.drain()
+        finished = list(done)
+        await scheduler.stop()
+        await scheduler.drain()  # после остановки не ждёт
+        return finished
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+
+def test_periodic_sealing_continues_after_a_failed_seal(monkeypatch):
+    from backend.routers import blockchain_routes
+
+    calls = []
+
+    class FlakyChain:
+        def seal_if_due(self):
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise OSError("disk full")
+
+    monkeypatch.setattr(blockchain_routes, "get_blockchain", lambda: FlakyChain())
+    monkeypatch.setattr(blockchain_routes, "mining_scheduler", MiningScheduler(maxsize=10))
+
+    async def scenario():
+        sealer = asyncio.create_task(blockchain_routes.seal_pending_periodically(0.01))
+        while len(calls) < 3 and not sealer.done():
+            await asyncio.sleep(0.01)
+        running = not sealer.done()
+        sealer.cancel()
+        await asyncio.gather(sealer, return_exceptions=True)
+        await blockchain_routes.mining_scheduler.stop()
+        return running
+
+    assert asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+    assert len(calls) >= 3
+
+def test_contract_change_is_single_block(blockchain, regular_user):
+    blockchain.add_contract_change(regular_user, {"position": "developer"})
+    assert len(blockchain.chain) == 2
+    payload = json.loads(blockchain.chain[-1].data)
+    assert payload["type"] == "batch"
+    assert [t["type"] for t in payload["transactions"]] == ["contract_change", "security_event"]
+    assert payload["merkle_root"] == merkle_root(payload["transactions"])
+
+def test_batched_records_visible_while_pending():
+    blockchain = Blockchain(batch_size=3)
+    votes = {"voter1": "yes"}
+    blockchain.create_vote("pending_issue", votes)
+    assert len(blockchain.chain) == 1
+    assert blockchain.get_vote_results("pending_issue") == votes
+    assert blockchain.get_vote_results("pending_issue", include_pending=False) == {}
+
+    blockchain.close_vote("pending_issue")  # третья запись запечатывает блок
+    assert len(blockchain.chain) == 2
+    assert len(blockchain.mempool) == 0
+    assert blockchain.get_vote_results("pending_issue", include_pending=False) == votes
+
+def test_merkle_root_odd_number_of_records():
+    records = [{"n": 1}, {"n": 2}, {"n": 3}]
+    assert merkle_root(records) == merkle_root(records + [records[-1]])
+    assert merkle_root(records) != merkle_root(records[:2])
+
+def test_incremental_validation_checks_only_new_blocks(blockchain, monkeypatch):
+    blockchain.mine_block("first")
+    blockchain.mine_block("second")
+    assert blockchain.is_chain_valid()
+    assert blockchain.verified_height == 2
+
+    blockchain.mine_block("third")
+    monkeypatch.setattr(blockchain, "_hash", lambda block: pytest.fail("hash recomputed"))
+    assert blockchain.is_chain_valid()
+    assert blockchain.verified_height == 3
+
+def test_audit_detects_tampering_of_verified_block(blockchain):
+    blockchain.mine_block("first")
+    blockchain.mine_block("second")
+    assert blockchain.is_chain_valid()
+
+    blockchain.chain[1].timestamp = "tampered"
+    assert blockchain.is_chain_valid()  # проверенный префикс не перепроверяется
+    assert blockchain.audit_chain() is False
+    assert blockchain.verified_height == 0
+
+def test_block_hash_cached_and_compatible(blockchain):
+    block = blockchain.mine_block("data")
+    legacy_hash = hashlib.sha256(json.dumps(block.to_dict(), sort_keys=True).encode()).hexdigest()
+    assert block.hash == legacy_hash == block.compute_hash()
+    assert blockchain.chain[-1].previous_hash == blockchain.chain[-2].hash
+
+def test_chain_survives_restart(tmp_path):
+    store = SegmentStore(tmp_path, fsync_every=2)
+    blockchain = Blockchain(store=store)
+    blockchain.mine_block("first")
+    blockchain.mine_block("second")
+    assert blockchain.is_chain_valid()
+    store.close()
+
+    restored = Blockchain(store=SegmentStore(tmp_path))
+    assert [b.hash for b in restored.chain] == [b.hash for b in blockchain.chain]
+    assert restored.verified_height == 2
+    restored.mine_block("third")
+    assert restored.is_chain_valid(full=True)
+
+def test_store_drops_torn_tail(tmp_path):
+    store = SegmentStore(tmp_path)
+    for payload in (b"one", b"two", b"three"):
+        store.append(payload)
+    store.close()
+    segment = next(tmp_path.glob("segment-*.log"))
+    with open(segment, "r+b") as file:
+        file.truncate(segment.stat().st_size - 2)
+    (tmp_path / "blocks.idx").unlink()
+
+    store = SegmentStore(tmp_path)
+    assert list(store) == [b"one", b"two"]
+    store.append(b"four")
+    assert store.read(2) == b"four"
+    store.close()
+
+def test_store_is_locked_against_a_second_writer(tmp_path):
+    store = SegmentStore(tmp_path)
+    store.append(b"one")
+    # flock действует на открытый файл, поэтому второе открытие в том же процессе
+    # ведёт себя так же, как открытие из другого воркера
+    with pytest.raises(StoreLocked):
+        SegmentStore(tmp_path)
+    store.close()
+
+    reopened = SegmentStore(tmp_path)
+    assert list(reopened) == [b"one"]
+    reopened.close()
+
+def test_indexes_follow_appends_and_rebuild(blockchain, regular_user):
+    blockchain.create_vote("issue", {"voter1": "yes"})
+    blockchain.add_contract_change(regular_user, {"position": "developer"})
+    blockchain.close_vote("issue")
+
+    assert [b.index for b in blockchain.get_blocks_by_type("vote")] == [1, 3]
+    assert [b.index for b in blockchain.get_contract_change_blocks("user")] == [2]
+    assert blockchain._votes["issue"][1]["closed"] is True
+
+    indexes = (blockchain._votes, blockchain._heights_by_type, blockchain._contract_changes)
+    blockchain.rebuild_indexes()
+    assert (blockchain._votes, blockchain._heights_by_type, blockchain._contract_changes) == indexes
+
+def test_indexes_built_after_restore(tmp_path):
+    store = SegmentStore(tmp_path)
+    blockchain = Blockchain(store=store)
+    blockchain.create_vote("persisted", {"voter1": "no"})
+    store.close()
+
+    restored = Blockchain(store=SegmentStore(tmp_path))
+    assert restored.get_vote_results("persisted") == {"voter1": "no"}
+
+def test_sealed_block_records_are_not_reparsed(blockchain, monkeypatch):
+    blockchain.create_vote("issue", {"voter1": "yes"})
+    block = blockchain.chain[-1]
+    monkeypatch.setattr(json, "loads", lambda *args, **kwargs: pytest.fail("data parsed again"))
+    assert [record.type for record in block.records] == ["vote"]
+    assert blockchain.get_vote_results("issue", include_pending=False) == {"voter1": "yes"}
+
+def test_difficulty_stored_and_validated_per_block():
+    blockchain = Blockchain(difficulty=8)
+    block = blockchain.mine_block("easy block")
+    assert block.difficulty == 8
+    assert blockchain.is_chain_valid(full=True)
+
+    block.difficulty = 24  # подмена сложности ломает хэш блока
+    assert not blockchain.is_chain_valid(full=True)
+
+def test_audit_rejects_chain_remined_below_configured_difficulty():
+    blockchain = Blockchain(difficulty=8)
+    blockchain.mine_block("one")
+    blockchain.mine_block("two")
+    assert blockchain.is_chain_valid(full=True)
+
+    # Та же цепочка после генезиса, перемайненная с минимальной сложностью
+    forged = Blockchain(difficulty=1)
+    forged.chain = [blockchain.chain[0]]
+    forged.mine_block("one")
+    forged.mine_block("two")
+    assert forged.is_chain_valid(full=True)
+
+    blockchain.chain = forged.chain
+    assert blockchain.audit_chain() is False
+
+def test_audit_rejects_difficulty_jump_beyond_max_step():
+    blockchain = Blockchain(difficulty=8, target_block_time=60, min_difficulty=4)
+    blockchain.mine_block("one")
+    blockchain._next_difficulty = lambda: 12
+    blockchain.mine_block("two")
+    assert blockchain.is_chain_valid(full=True) is False
+
+def test_legacy_block_without_difficulty_keeps_hash():
+    legacy = {"index": 1, "timestamp": "2024-01-01 00:00:00", "data": "x", "proof": 1, "previous_hash": "0"}
+    block = Block.from_dict(legacy)
+    assert block.difficulty is None
+    assert block.hash == hashlib.sha256(json.dumps(legacy, sort_keys=True).encode()).hexdigest()
+
+def test_next_difficulty_moves_toward_target():
+    assert next_difficulty(16, [0.25] * 5, target_interval=1.0) == 18
+    assert next_difficulty(16, [4.0] * 5, target_interval=1.0) == 14
+    assert next_difficulty(16, [1.0] * 5, target_interval=1.0) == 16
+    assert next_difficulty(16, [], target_interval=1.0) == 16
+
+def test_mining_stats_reports_rate():
+    blockchain = Blockchain(difficulty=8, target_block_time=60)
+    blockchain.mine_block("one")
+    blockchain.mine_block("two")
+    stats = blockchain.mining_stats()
+    assert stats["blocks_mined"] == 2
+    assert stats["difficulty"] >= 8
+    assert stats["hash_rate"] > 0
+
+class InstantMiner:
+    workers = 1
+
+    def find_proof(self, *args, **kwargs):
+        return 1
+
+def test_difficulty_ignores_idle_time_between_blocks():
+    blockchain = Blockchain(miner=InstantMiner(), difficulty=8, target_block_time=0.01)
+    for data in ("one", "two", "three"):
+        blockchain.mine_block(data)
+        # Простой между запросами намного больше целевого времени блока
+        time.sleep(0.05)
+    # Сам proof-of-work мгновенный, поэтому сложность растёт, а не падает
+    assert blockchain.difficulty > 8
+
+def test_configured_difficulty_applies_after_restart_without_adjustment(tmp_path):
+    store = SegmentStore(tmp_path)
+    Blockchain(store=store, difficulty=8).mine_block("one")
+    store.close()
+
+    store = SegmentStore(tmp_path)
+    assert Blockchain(store=store, difficulty=10).difficulty == 10
+    store.close()
+    store = SegmentStore(tmp_path)
+    assert Blockchain(store=store, difficulty=10, target_block_time=60, min_difficulty=8).difficulty == 8
+    store.close()
+
+def test_v1_proofs_match_original_hex_prefix_check():
+    for index, data in enumerate(["Genesis", "block data"], start=1):
+        proof = SerialMiner().find_proof(1, index, data, version=POW_V1)
+        hashes = [hashlib.sha256(f"{p ** 2 - 1 + index}{data}".encode()).hexdigest() for p in range(1, proof + 1)]
+        assert [h[:4] == "0000" for h in hashes].index(True) == proof - 1
+
+def test_chain_with_v1_and_v2_blocks_validates():
+    blockchain = Blockchain(pow_version=POW_V1)
+    legacy = blockchain.mine_block("legacy")
+    blockchain.pow_version = POW_V2
+    current = blockchain.mine_block("current")
+    assert legacy.version is None and current.version == POW_V2
+    assert blockchain.is_chain_valid(full=True)
+
+    current.proof += 1  # подмена proof обнаруживается
+    assert not blockchain.is_chain_valid(full=True)
+
+
+def test_key_ring_persists_keys_and_decrypts_after_rotation(tmp_path):
+    path = tmp_path / "keys.json"
+    ring = KeyRing(path, workers=2)
+    legacy = Fernet(ring._raw_keys[1].encode()).encrypt(b"legacy").decode()
+    old = ring.encrypt_many([f"payload {i}" for i in range(300)])
+    assert ring.decrypt_many(old) == [f"payload {i}" for i in range(300)]
+
+    rotated = []
+    version = ring.rotate(old, lambda before, after: rotated.extend(after))
+    ring.wait_rotation()
+    assert version == 2 and len(rotated) == 300
+    assert {ring.key_version(token) for token in rotated} == {2}
+    ring.close()
+
+    reopened = KeyRing(path)
+    assert reopened.current_version == 2
+    assert reopened.decrypt(old[0]) == reopened.decrypt(rotated[0]) == "payload 0"
+    assert reopened.decrypt(legacy) == "legacy"
+    reopened.retire(1)
+    assert KeyRing(path).stats()["versions"] == [2]
+
+
+def test_key_ring_rotations_from_two_processes_keep_all_keys(tmp_path):
+    path = tmp_path / "keys.json"
+    first, second = KeyRing(path), KeyRing(path)
+    assert first._raw_keys == second._raw_keys
+
+    # Оба воркера ротируют ключ, не зная о ротации соседа
+    assert first.rotate() == 2
+    assert second.rotate() == 3
+    token = second.encrypt("from second")
+
+    # Незнакомая версия заставляет перечитать файл ключей
+    assert first.decrypt(token) == "from second"
+    assert KeyRing(path).stats()["versions"] == [1, 2, 3]
+
+
+def test_importing_the_app_opens_no_store_until_first_use(tmp_path):
+    data_dir = tmp_path / "chain"
+    script = (
+        "import os, main\n"
+        "from backend.routers import blockchain_routes\n"
+        "assert not os.path.exists(os.environ['BLOCKCHAIN_DATA_DIR']), 'store opened at import'\n"
+        "blockchain_routes.get_blockchain().mine_block('first')\n"
+        "blockchain_routes.close_blockchain()\n"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    env = dict(os.environ, BLOCKCHAIN_DATA_DIR=str(data_dir), MINING_DIFFICULTY="4",
+               DATABASE_URL=f"sqlite+aiosqlite:///{tmp_path / 'app.db'}", PYTHONPATH=root)
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert (data_dir / "keys.json").exists() and list(data_dir.glob("segment-*.log"))
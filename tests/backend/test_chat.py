@@ -0,0 +1,228 @@
+import asyncio
+import datetime as dt
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Message, User
+from backend.routers import websocket_routes
+from backend.services.chat_service import MessageNotFound, get_messages_between_users
+from backend.services.message_writer import MessageWriter
+
+from backend.services.ws_broker import PostgresBroker
+from backend.services.ws_connection import DISCONNECT, DROP_OLDEST, ClientConnection
+
+
+class FakeConnection:
+    def __init__(self):
+        self.listeners = {}
+        self.notified = []
+
+    def is_closed(self):
+        return False
+
+    def add_termination_listener(self, callback):
+        pass
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def execute(self, query, channel, payload):
+        # Как и PostgreSQL, рассылаем уведомление всем слушателям канала
+        self.notified.append(payload)
+        self.listeners[channel](self, 0, channel, payload)
+
+    async def close(self):
+        pass
+
+
+def test_postgres_broker_routes_notifications_to_local_delivery():
+    connection = FakeConnection()
+    delivered = []
+
+    class Broker(PostgresBroker):
+        async def _connect(self):
+            return connection
+
+    async def deliver(recipient_id, message):
+        delivered.append((recipient_id, message))
+
+    async def scenario():
+        broker = Broker("postgresql://unused")
+        await broker.start(deliver)
+        await broker.publish("2", {"from": "1", "message": "hi"})
+        await asyncio.sleep(0)
+        await broker.stop()
+        return broker
+
+    broker = asyncio.run(scenario())
+    assert delivered == [("2", {"from": "1", "message": "hi"})]
+    assert json.loads(connection.notified[0])["to"] == "2"
+    assert broker.stats()["received"] == 1
+
+
+class SlowSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.release = asyncio.Event()
+
+    async def send_json(self, message):
+        await self.release.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+def test_client_connection_drops_oldest_when_queue_is_full():
+    socket = SlowSocket()
+
+    async def scenario():
+        connection = ClientConnection("2", socket, maxsize=2, policy=DROP_OLDEST)
+        connection.start()
+        connection.enqueue({"n": 0})
+        await asyncio.sleep(0)  # писатель забирает первое сообщение и ждёт медленный сокет
+        for i in range(1, 4):
+            assert connection.enqueue({"n": i})
+        socket.release.set()
+        while connection.stats()["queued"]:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        await connection.stop()
+        return connection.stats()
+
+    stats = asyncio.run(scenario())
+    assert [m["n"] for m in socket.sent] == [0, 2, 3]
+    assert stats["dropped"] == 1 and stats["sent"] == 3
+
+
+def test_client_connection_disconnects_on_overflow():
+    socket = SlowSocket()
+
+    async def scenario():
+        connection = ClientConnection("2", socket, maxsize=1, policy=DISCONNECT)
+        connection.start()
+        connection.enqueue({"n": 0})
+        await asyncio.sleep(0)
+        assert connection.enqueue({"n": 1})
+        assert not connection.enqueue({"n": 2})
+        await asyncio.sleep(0)
+        await connection.stop()
+        return connection
+
+    connection = asyncio.run(scenario())
+    assert connection.closed and socket.closed_with == 1013
+
+
+def test_message_writer_persists_concurrent_messages_in_one_batch(sqlite_db):
+    async def scenario():
+        async with sqlite_db() as db:
+            writer = MessageWriter(sessionmaker(db.bind, class_=AsyncSession), batch_size=10, flush_interval=0.01)
+            stored = await asyncio.gather(*(writer.submit(1, 2, f"m{i}") for i in range(25)))
+            count = (await db.execute(select(func.count()).select_from(Message))).scalar()
+        return stored, count, writer.stats()
+
+    stored, count, stats = asyncio.run(scenario())
+    assert count == 25
+    assert [row["content"] for row in stored] == [f"m{i}" for i in range(25)]
+    assert [row["id"] for row in stored] == sorted(row["id"] for row in stored)
+    assert stats["batches"] == 3
+
+
+def websocket_app() -> TestClient:
+    app = FastAPI()
+    app.include_router(websocket_routes.router)
+    return TestClient(app)
+
+
+def test_websocket_rejects_connection_without_access_token():
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with websocket_app().websocket_connect("/ws", headers={"user_id": "1"}):
+            pass
+    assert closed.value.code == 1008
+
+
+def test_websocket_takes_sender_from_token_not_header(monkeypatch):
+    persisted = []
+
+    async def authenticate(token, db):
+        return SimpleNamespace(id=5) if token == "valid" else None
+
+    monkeypatch.setattr(websocket_routes, "authenticate_token", authenticate)
+    monkeypatch.setattr(websocket_routes, "persist_message",
+                        lambda connection, sender, recipient, message, client_id=None:
+                        persisted.append((sender, recipient, message)))
+
+    client = websocket_app()
+    client.cookies.set("access_token", "valid")
+    with client.websocket_connect("/ws", headers={"user_id": "1"}) as websocket:
+        websocket.send_json({"to": 7, "message": "hello"})
+        websocket.send_json({"message": "no recipient"})
+    assert persisted == [("5", "7", "hello")]
+
+
+def test_message_writer_fails_only_the_invalid_row_of_a_batch(sqlite_db):
+    async def scenario():
+        async with sqlite_db(foreign_keys=True) as db:
+            await db.execute(insert(User), [{"id": 1, "username": "a", "hashed_password": "x"},
+                                            {"id": 2, "username": "b", "hashed_password": "x"}])
+            await db.commit()
+            writer = MessageWriter(sessionmaker(db.bind, class_=AsyncSession), batch_size=10, flush_interval=0.01)
+
+            results = await asyncio.gather(writer.submit(1, 2, "first"), writer.submit(1, 999, "bad"),
+                                           writer.submit(2, 1, "second"), return_exceptions=True)
+            stored = (await db.execute(select(Message.content).order_by(Message.id))).scalars().all()
+        return results, stored, writer.stats()
+
+    results, stored, stats = asyncio.run(scenario())
+    assert results[0]["content"] == "first" and results[2]["content"] == "second"
+    assert isinstance(results[1], Exception)
+    assert stored == ["first", "second"]
+    assert stats["written"] == 2 and stats["failed"] == 1
+
+
+def test_message_history_pages_through_both_directions(sqlite_db):
+    start = dt.datetime(2024, 1, 1)
+
+    async def scenario():
+        async with sqlite_db() as db:
+            # Сообщения 3 и 4 отправлены в одну и ту же секунду; 6 — чужая переписка
+            rows = [(1, 2, 0), (2, 1, 1), (1, 2, 2), (2, 1, 2), (1, 2, 3), (1, 3, 4), (2, 1, 5)]
+            await db.execute(insert(Message), [
+                {"id": i, "sender_id": sender, "receiver_id": receiver, "content": f"m{i}",
+                 "timestamp": start + dt.timedelta(seconds=second)}
+                for i, (sender, receiver, second) in enumerate(rows, start=1)
+            ])
+            await db.commit()
+
+            async def page(**cursor):
+                return [row["id"] for row in await get_messages_between_users(db, 1, 2, limit=2, **cursor)]
+
+            pages = {
+                "first": await page(),
+                "second": await page(before_id=5),
+                "third": await page(before_id=3),
+                "last": await page(before_id=1),
+                "newer": await page(after_id=3),
+                "by_time": await page(before=start + dt.timedelta(seconds=2)),
+            }
+            with pytest.raises(MessageNotFound):
+                await page(before_id=100)
+        return pages
+
+    pages = asyncio.run(scenario())
+    assert pages["first"] == [5, 7]
+    # Одинаковое время: порядок и граница страницы определяются id
+    assert pages["second"] == [3, 4]
+    assert pages["third"] == [1, 2]
+    assert pages["last"] == []
+    assert pages["newer"] == [4, 5]
+    assert pages["by_time"] == [1, 2]
@@ -0,0 +1,120 @@
+import asyncio
+import io
+import json
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from backend.middleware.instrumentation import InstrumentationMiddleware, RequestMetrics
+from backend.routers import metrics_routes
+from backend.utils.database import InstrumentedQueuePool, checkout_wait, instrument_engine, pool_status
+from backend.utils.logging_config import parse_levels, setup_logging
+from backend.utils.metrics import request_phases, span
+
+
+def test_middleware_records_route_latency_and_phases():
+    metrics = RequestMetrics()
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware, metrics=metrics)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with span("db"):
+            pass
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    text = "\n".join(metrics.render())
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3' in text
+    assert 'http_responses_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'http_request_phase_seconds_total{route="/items/{item_id}",phase="db"}' in text
+
+
+def test_logging_writes_json_lines_with_per_module_levels():
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    stream = io.StringIO()
+    listener = setup_logging("INFO", parse_levels("noisy.module=WARNING, chatty.module=debug"), stream=stream)
+    try:
+        logging.getLogger("noisy.module").info("dropped")
+        logging.getLogger("chatty.module").debug("kept %s", 1, extra={"user_id": "7"})
+        logging.getLogger("plain").debug("dropped")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("plain").exception("failed")
+    finally:
+        listener.stop()
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+        for name in ("noisy.module", "chatty.module"):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r["logger"], r["message"]) for r in records] == [("chatty.module", "kept 1"), ("plain", "failed")]
+    assert records[0]["level"] == "DEBUG" and records[0]["user_id"] == "7"
+    assert "ValueError: boom" in records[1]["exc"]
+
+
+def test_pool_status_reports_checked_out_connections_and_wait(sqlite_db):
+    async def scenario():
+        async with sqlite_db(create_schema=False, poolclass=InstrumentedQueuePool,
+                             pool_size=2, max_overflow=1) as db:
+            engine = db.bind
+            waits_before = checkout_wait.count
+            async with engine.connect() as first, engine.connect() as second:
+                await first.execute(text("SELECT 1"))
+                await second.execute(text("SELECT 1"))
+                busy = pool_status(engine)
+            idle = pool_status(engine)
+        return busy, idle, checkout_wait.count - waits_before
+
+    busy, idle, waits = asyncio.run(scenario())
+    assert busy["pool_class"] == "InstrumentedQueuePool"
+    assert (busy["size"], busy["checked_out"], busy["max_overflow"]) == (2, 2, 1)
+    assert (idle["checked_out"], idle["idle"]) == (0, 2)
+    assert waits == 2
+
+
+def test_query_timing_survives_failed_queries(sqlite_db):
+    async def scenario():
+        async with sqlite_db(create_schema=False) as db:
+            instrument_engine(db.bind.sync_engine)
+            phases = {}
+            token = request_phases.set(phases)
+            try:
+                async with db.bind.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                    with pytest.raises(OperationalError):
+                        await conn.execute(text("SELECT * FROM missing_table"))
+                    pending = list((await conn.get_raw_connection()).info.get("query_started", []))
+                    await conn.execute(text("SELECT 2"))
+            finally:
+                request_phases.reset(token)
+        return phases, pending
+
+    phases, pending = asyncio.run(scenario())
+    assert pending == []
+    assert phases["db"] > 0
+
+
+def test_metrics_endpoint_is_local_only():
+    app = FastAPI()
+    app.include_router(metrics_routes.router)
+    client = TestClient(app)
+    # TestClient представляется хостом "testclient", то есть удалённым клиентом
+    assert client.get("/metrics").status_code == 403
+
+    app.dependency_overrides[metrics_routes.require_metrics_access] = lambda: None
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE db_pool_checkout_wait_seconds histogram" in response.text
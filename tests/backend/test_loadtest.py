@@ -0,0 +1,53 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+LOADTEST = os.path.join(ROOT, "benchmarks", "loadtest.py")
+
+SCENARIO_FIELDS = {"requests", "errors", "seconds", "rps", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+
+
+def load_loadtest():
+    spec = importlib.util.spec_from_file_location("loadtest", LOADTEST)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_loadtest_runs_in_process_and_writes_comparable_results(tmp_path):
+    output = tmp_path / "results.json"
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    result = subprocess.run(
+        [sys.executable, LOADTEST, "--scenarios", "dashboard,chat_history", "--concurrency", "1",
+         "--duration", "0.3", "--output", str(output)],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+
+    results = json.loads(output.read_text())
+    assert set(results) == {"meta", "scenarios"}
+    assert results["meta"]["format"] == load_loadtest().RESULT_FORMAT
+    assert results["meta"]["target"] == "in-process" and results["meta"]["database"] == "sqlite+aiosqlite"
+    assert set(results["scenarios"]) == {"dashboard", "chat_history"}
+    for scenario in results["scenarios"].values():
+        assert SCENARIO_FIELDS <= set(scenario)
+        assert scenario["requests"] > 0 and scenario["errors"] == 0
+        assert scenario["p50_ms"] <= scenario["p95_ms"] <= scenario["p99_ms"] <= scenario["max_ms"]
+
+
+def test_compare_flags_regressions_beyond_threshold(capsys):
+    loadtest = load_loadtest()
+
+    def run(rps, p95):
+        return {"meta": {"format": loadtest.RESULT_FORMAT, "commit": "abc"},
+                "scenarios": {"login": loadtest.summarize([p95 / 1000] * 10, 0, 10 / rps, None),
+                              "ws_relay": {"skipped": "websockets package is not installed"}}}
+
+    baseline = run(rps=100, p95=10)
+    assert loadtest.compare(baseline, run(rps=95, p95=11), threshold=20) == []
+    assert loadtest.compare(baseline, run(rps=50, p95=10), threshold=20) == ["login"]
+    assert "compared with abc" in capsys.readouterr().out
+    assert loadtest.percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
@@ -0,0 +1,77 @@
+import asyncio
+
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+from backend.models import User
+from backend.services.password_hasher import PasswordHasher
+from backend.services.user_import import CSV, NDJSON, UserImporter, import_users
+from backend.utils.db_utils import keyset_page
+
+
+def test_keyset_page_walks_all_users_without_gaps(sqlite_db):
+    async def scenario():
+        async with sqlite_db() as db:
+            db.add_all(User(username=f"user{i}", hashed_password="x") for i in range(25))
+            await db.commit()
+
+            pages, after = [], None
+            while True:
+                rows, after = await keyset_page(db, User.id, [User.id, User.username], after, limit=10)
+                pages.append([row.username for row in rows])
+                if after is None:
+                    break
+        return pages
+
+    pages = asyncio.run(scenario())
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == [f"user{i}" for i in range(25)]
+
+
+def test_import_marks_malformed_rows_invalid_and_leaves_room_for_logins(sqlite_db):
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), workers=4)
+    body = (b'{"username": "ann", "password": "pw", "role": ["admin"]}\n\xff\xfe\n'
+            b'{"username": "ben", "password": "pw"}\n')
+
+    async def chunks():
+        yield body
+
+    async def scenario():
+        async with sqlite_db() as db:
+            slots = UserImporter(db, hasher=hasher)._hash_slots._value
+            report = await import_users(db, chunks(), NDJSON, hasher=hasher)
+        return slots, report
+
+    slots, report = asyncio.run(scenario())
+    hasher.shutdown()
+    assert slots == 2
+    # Пул по умолчанию из двух потоков тоже хэширует пароли импорта параллельно
+    default_pool = PasswordHasher(workers=2)
+    assert UserImporter(None, hasher=default_pool)._hash_slots._value == 2
+    default_pool.shutdown()
+    assert [(row["line"], row["status"], row.get("detail")) for row in report["rows"]] == [
+        (1, "invalid", "role must be a string"), (2, "invalid", "Invalid UTF-8"), (3, "created", None),
+    ]
+
+def test_import_users_reports_each_row(sqlite_db):
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), workers=2)
+    body = b"username,password,role\nalice,pw1,\nbob,pw2,admin\nalice,pw3,\ncarol,,\ndave,pw4,root\nerin,pw5,viewer"
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    async def scenario():
+        async with sqlite_db() as db:
+            db.add(User(username="erin", hashed_password="x"))
+            await db.commit()
+            report = await import_users(db, chunks(), CSV, hasher=hasher, batch_size=2)
+            roles = dict((await db.execute(select(User.username, User.role))).all())
+        return report, roles
+
+    report, roles = asyncio.run(scenario())
+    hasher.shutdown()
+    assert [(row["line"], row["status"]) for row in report["rows"]] == [
+        (2, "created"), (3, "created"), (4, "duplicate"), (5, "invalid"), (6, "invalid"), (7, "exists"),
+    ]
+    assert roles == {"alice": "user", "bob": "admin", "erin": "none"}
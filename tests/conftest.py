@@ -0,0 +1,47 @@
+import os
+# Добавляем путь к backend, где находятся основные файлы, такие как main.py
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# Добавляем путь к backend
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+# Добавляем путь к blockchain, где находится blockchain_func.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend', 'blockchain')))
+
+from backend.utils.database import Base  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """
+    Асинхронная база SQLite во временном каталоге теста.
+
+    Возвращает фабрику контекста, который создаёт движок и схему приложения, отдаёт
+    AsyncSession (движок доступен как db.bind) и закрывает движок при выходе.
+    Использование: async with sqlite_db() as db: ...
+
+    :param create_schema: Создать таблицы моделей
+    :param foreign_keys: Включить проверку внешних ключей (PRAGMA foreign_keys=ON)
+    :param options: Дополнительные аргументы create_async_engine (например, poolclass)
+    """
+    @asynccontextmanager
+    async def open_db(create_schema: bool = True, foreign_keys: bool = False, **options):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", **options)
+        if foreign_keys:
+            event.listen(engine.sync_engine, "connect",
+                         lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+        try:
+            if create_schema:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+            async with AsyncSession(engine) as db:
+                yield db
+        finally:
+            await engine.dispose()
+
+    return open_db